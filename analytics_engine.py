@@ -0,0 +1,129 @@
+import threading
+import pandas as pd
+import streamlit as st
+import trend_engine
+
+# Bump when the store's tables or triggers change: the next start rebuilds them from clients/session_events
+ANALYTICS_STORE_VERSION = 2
+THROUGHPUT_WEEKS = 12
+
+def _mock_series_select(where):
+    # Per-client summary rows from mock_scores: count, averages and the latest mock
+    return f"""
+        SELECT m.client_id, c.student, COUNT(*), AVG(m.tech), AVG(m.beh), latest.tech, latest.beh, latest.mock_date
+        FROM mock_scores m JOIN clients c ON c.id = m.client_id
+        JOIN mock_scores latest ON latest.id = (SELECT MAX(id) FROM mock_scores WHERE client_id = m.client_id)
+        WHERE {where} GROUP BY m.client_id
+    """
+
+_WEEK = "date({row}.created_at, 'weekday 0', '-6 days')"
+
+def ensure_store(conn):
+    """Creates the pre-aggregated tables and the triggers that keep them current on every write to
+    clients / mock_scores / session_events (from any page or connection). Runs inside the schema setup job:
+    one statement per execute, no commits."""
+    conn.execute("CREATE TABLE IF NOT EXISTS analytics_type_mix (type TEXT PRIMARY KEY, clients INTEGER NOT NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_mock_series (
+            client_id INTEGER PRIMARY KEY, student TEXT, mocks INTEGER,
+            tech_avg REAL, beh_avg REAL, tech_last REAL, beh_last REAL, last_date TEXT
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS analytics_throughput (week TEXT, event_type TEXT, sessions INTEGER NOT NULL, PRIMARY KEY (week, event_type))")
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('session_events', 0)")
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('mock_scores', 0)")
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('analytics_store', 0)")
+    if conn.execute("SELECT version FROM data_version WHERE name = 'analytics_store'").fetchone()[0] == ANALYTICS_STORE_VERSION: return
+
+    for name in ("type_mix_ai", "type_mix_au", "type_mix_ad", "mocks_ai", "mocks_au", "mocks_ad", "mocks_rename", "throughput_ai", "throughput_ad"):
+        conn.execute(f"DROP TRIGGER IF EXISTS analytics_{name}")
+    # Session-type mix: +1/-1 per client row
+    add_type = "INSERT INTO analytics_type_mix (type, clients) VALUES (COALESCE(new.type, 'Unknown'), 1) ON CONFLICT (type) DO UPDATE SET clients = clients + 1;"
+    drop_type = "UPDATE analytics_type_mix SET clients = clients - 1 WHERE type = COALESCE(old.type, 'Unknown'); DELETE FROM analytics_type_mix WHERE clients <= 0;"
+    conn.execute(f"CREATE TRIGGER analytics_type_mix_ai AFTER INSERT ON clients BEGIN {add_type} END")
+    conn.execute(f"CREATE TRIGGER analytics_type_mix_au AFTER UPDATE OF type ON clients WHEN new.type IS NOT old.type BEGIN {drop_type} {add_type} END")
+    conn.execute(f"CREATE TRIGGER analytics_type_mix_ad AFTER DELETE ON clients BEGIN {drop_type} END")
+    # Mock series: one summary row per client, recomputed from that client's mock_scores rows only
+    def refresh_mocks(row):
+        return (f"DELETE FROM analytics_mock_series WHERE client_id = {row}.client_id;"
+                f"INSERT INTO analytics_mock_series {_mock_series_select(f'm.client_id = {row}.client_id')};"
+                "UPDATE data_version SET version = version + 1 WHERE name = 'mock_scores';")
+    conn.execute(f"CREATE TRIGGER analytics_mocks_ai AFTER INSERT ON mock_scores BEGIN {refresh_mocks('new')} END")
+    conn.execute(f"CREATE TRIGGER analytics_mocks_au AFTER UPDATE ON mock_scores BEGIN {refresh_mocks('old')} {refresh_mocks('new')} END")
+    conn.execute(f"CREATE TRIGGER analytics_mocks_ad AFTER DELETE ON mock_scores BEGIN {refresh_mocks('old')} END")
+    conn.execute("CREATE TRIGGER analytics_mocks_rename AFTER UPDATE OF student ON clients BEGIN UPDATE analytics_mock_series SET student = new.student WHERE client_id = new.id; END")
+    # Throughput: sessions logged per week and event type (legacy entries have no date and are left out)
+    bump_events = "UPDATE data_version SET version = version + 1 WHERE name = 'session_events';"
+    conn.execute(f"""
+        CREATE TRIGGER analytics_throughput_ai AFTER INSERT ON session_events BEGIN
+            INSERT INTO analytics_throughput (week, event_type, sessions) SELECT {_WEEK.format(row='new')}, COALESCE(new.event_type, 'Other'), 1
+                WHERE {_WEEK.format(row='new')} IS NOT NULL
+                ON CONFLICT (week, event_type) DO UPDATE SET sessions = sessions + 1;
+            {bump_events}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER analytics_throughput_ad AFTER DELETE ON session_events BEGIN
+            UPDATE analytics_throughput SET sessions = sessions - 1 WHERE week = {_WEEK.format(row='old')} AND event_type = COALESCE(old.event_type, 'Other');
+            DELETE FROM analytics_throughput WHERE sessions <= 0;
+            {bump_events}
+        END
+    """)
+    rebuild(conn)
+    conn.execute("UPDATE data_version SET version = ? WHERE name = 'analytics_store'", (ANALYTICS_STORE_VERSION,))
+
+def rebuild(conn):
+    """Recomputes every aggregate from scratch (first start, or after a store version bump)."""
+    conn.execute("DELETE FROM analytics_type_mix")
+    conn.execute("INSERT INTO analytics_type_mix (type, clients) SELECT COALESCE(type, 'Unknown'), COUNT(*) FROM clients GROUP BY 1")
+    conn.execute("DELETE FROM analytics_mock_series")
+    conn.execute(f"INSERT INTO analytics_mock_series {_mock_series_select('true')}")
+    conn.execute("DELETE FROM analytics_throughput")
+    conn.execute(f"""
+        INSERT INTO analytics_throughput (week, event_type, sessions)
+        SELECT {_WEEK.format(row='e')}, COALESCE(e.event_type, 'Other'), COUNT(*) FROM session_events e
+        WHERE {_WEEK.format(row='e')} IS NOT NULL GROUP BY 1, 2
+    """)
+
+# --- READS ---
+def store_version(conn):
+    rows = conn.execute("SELECT name, version FROM data_version WHERE name IN ('clients', 'mock_scores', 'session_events') ORDER BY name").fetchall()
+    return tuple(row[1] for row in rows)
+
+def type_mix(conn):
+    return pd.read_sql_query("SELECT type, clients AS n FROM analytics_type_mix ORDER BY n DESC", conn).set_index('type')['n']
+
+def mock_series(conn):
+    return pd.read_sql_query("""
+        SELECT student AS "Student", tech_last AS "Technical", beh_last AS "Behavioral", mocks AS "Mocks",
+               ROUND(tech_avg, 1) AS "Tech Avg", ROUND(beh_avg, 1) AS "Beh Avg", last_date AS "Last Mock"
+        FROM analytics_mock_series ORDER BY student
+    """, conn)
+
+def throughput(conn, weeks=THROUGHPUT_WEEKS):
+    """Sessions per week (rows) and event type (columns) for the latest `weeks` weeks."""
+    frame = pd.read_sql_query("""
+        SELECT week, event_type, sessions FROM analytics_throughput
+        WHERE week >= (SELECT date(MAX(week), ?) FROM analytics_throughput)
+    """, conn, params=(f"-{7 * (weeks - 1)} days",))
+    return frame.pivot_table(index="week", columns="event_type", values="sessions", aggfunc="sum", fill_value=0)
+
+class AnalyticsCache:
+    """The dashboard's frames, re-read only when clients, mock_scores or session_events have changed."""
+    def __init__(self):
+        self.version = None
+        self.frames = None
+        self.lock = threading.Lock()
+
+    def snapshot(self, conn):
+        version = store_version(conn)
+        with self.lock:
+            if version != self.version:
+                self.frames = {"type_mix": type_mix(conn), "mock_series": mock_series(conn), "throughput": throughput(conn),
+                               "trends": trend_engine.compute_trends(trend_engine.load_scores(conn))}
+                self.version = version
+            return self.frames
+
+@st.cache_resource
+def get_analytics_cache():
+    return AnalyticsCache()
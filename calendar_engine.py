@@ -0,0 +1,42 @@
+import calendar
+import datetime
+
+VIEWS = ("Month", "Week", "Day")
+SESSION_COLUMNS = "id, student, session_date, time, type"
+
+def view_range(view, anchor):
+    """(first_day, last_day) dates covered by a Month/Week/Day view around `anchor`. Weeks run Mon-Sun."""
+    if view == "Day": return anchor, anchor
+    if view == "Week":
+        start = anchor - datetime.timedelta(days=anchor.weekday())
+        return start, start + datetime.timedelta(days=6)
+    start = anchor.replace(day=1)
+    return start, start.replace(day=calendar.monthrange(anchor.year, anchor.month)[1])
+
+def shift(view, anchor, step):
+    """Moves the anchor one view-length forward (step=1) or back (step=-1)."""
+    if view == "Day": return anchor + datetime.timedelta(days=step)
+    if view == "Week": return anchor + datetime.timedelta(weeks=step)
+    month_index = anchor.year * 12 + anchor.month - 1 + step
+    year, month = divmod(month_index, 12)
+    return datetime.date(year, month + 1, min(anchor.day, calendar.monthrange(year, month + 1)[1]))
+
+def view_title(view, anchor):
+    start, end = view_range(view, anchor)
+    if view == "Day": return anchor.strftime("%A %d %B %Y")
+    if view == "Week": return f"{start.strftime('%d %b')} – {end.strftime('%d %b %Y')}"
+    return f"{calendar.month_name[anchor.month]} {anchor.year}"
+
+def sessions_between(conn, start, end):
+    """Session summaries with session_date in [start, end], ordered by date then time.
+    A range scan on idx_clients_session_date, so cost follows the sessions shown, not the client book."""
+    rows = conn.execute(f"SELECT {SESSION_COLUMNS} FROM clients WHERE session_date BETWEEN ? AND ? ORDER BY session_date, time",
+                        (str(start), str(end))).fetchall()
+    return [dict(row) for row in rows]
+
+def load_view(conn, view, anchor):
+    """{'YYYY-MM-DD': [sessions]} for every session in the view, bucketed in one pass."""
+    buckets = {}
+    for session in sessions_between(conn, *view_range(view, anchor)):
+        buckets.setdefault(session['session_date'], []).append(session)
+    return buckets
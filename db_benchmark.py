@@ -0,0 +1,82 @@
+"""Simulates N mentors saving sessions at once against a scratch database.
+
+    python db_benchmark.py --mentors 8 --saves 50
+
+Each save is what the Session Prep page does: read-modify-write of clients.mock_data plus one
+session_events INSERT. "direct" is the old setup (every mentor writes on its own connection,
+rollback journal, commit per statement); "queued" goes through db_engine's WAL readers and
+serialized writer.
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+import db_engine
+
+def _setup(conn):
+    conn.execute("CREATE TABLE clients (id INTEGER PRIMARY KEY AUTOINCREMENT, student TEXT, mock_data TEXT)")
+    conn.execute("CREATE TABLE session_events (id INTEGER PRIMARY KEY AUTOINCREMENT, client_id INTEGER, created_at TEXT, event_type TEXT, scores TEXT, notes TEXT)")
+
+def _save(conn, client_id, n):
+    row = conn.execute("SELECT mock_data FROM clients WHERE id = ?", (client_id,)).fetchone()
+    mocks = json.loads(row[0]) if row[0] else []
+    mocks.append({"tech": n % 10, "beh": (n * 3) % 10})
+    conn.execute("UPDATE clients SET mock_data = ? WHERE id = ?", (json.dumps(mocks), client_id))
+    conn.execute("INSERT INTO session_events (client_id, created_at, event_type, scores, notes) VALUES (?, datetime('now'), 'Mock Interview', ?, ?)",
+                 (client_id, json.dumps({"tech": n % 10}), "benchmark " * 20))
+
+def _run_mentors(mentors, saves, save_fn):
+    errors = []
+    def mentor(m):
+        for n in range(saves):
+            # Mentors rotate over the same clients, so saves on one client do overlap
+            try: save_fn((m + n) % mentors + 1, n)
+            except Exception as e: errors.append(str(e))
+    threads = [threading.Thread(target=mentor, args=(m,)) for m in range(mentors)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.perf_counter() - start, errors
+
+def bench_direct(path, mentors, saves):
+    conn = sqlite3.connect(path); _setup(conn)
+    conn.executemany("INSERT INTO clients (student) VALUES (?)", [(f"MENTEE {m}",) for m in range(mentors)]); conn.commit()
+    local = threading.local()
+    def save(client_id, n):
+        if not hasattr(local, "conn"): local.conn = sqlite3.connect(path, timeout=5.0)
+        _save(local.conn, client_id, n)
+        local.conn.commit()
+    seconds, errors = _run_mentors(mentors, saves, save)
+    return seconds, errors, None
+
+def bench_queued(path, mentors, saves):
+    db = db_engine.Database(path, setup=_setup)
+    db.write(lambda conn: conn.executemany("INSERT INTO clients (student) VALUES (?)", [(f"MENTEE {m}",) for m in range(mentors)]))
+    seconds, errors = _run_mentors(mentors, saves, lambda client_id, n: db.write(lambda conn: _save(conn, client_id, n)))
+    return seconds, errors, db.stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mentors", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=50, help="saves per mentor")
+    args = parser.parse_args()
+    total = args.mentors * args.saves
+    print(f"{args.mentors} mentors x {args.saves} saves = {total} saves")
+    for name, bench in (("direct", bench_direct), ("queued", bench_queued)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            seconds, errors, stats = bench(path, args.mentors, args.saves)
+            check = sqlite3.connect(path)
+            events = check.execute("SELECT COUNT(*) FROM session_events").fetchone()[0]
+            mocks = sum(len(json.loads(r[0] or "[]")) for r in check.execute("SELECT mock_data FROM clients"))
+            check.close()
+            line = f"{name:>6}: {seconds:6.2f}s  {total / seconds:8.1f} saves/s  errors={len(errors)}  events={events}/{total}  mock entries={mocks}/{total}"
+            if stats: line += f"  commits={stats['commits']}"
+            print(line)
+            if errors: print(f"        first error: {errors[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# WAL lets readers run while the writer commits; NORMAL is durable across app crashes in WAL mode
+PRAGMAS = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA busy_timeout=5000", "PRAGMA temp_store=MEMORY")
+WRITE_BATCH_MAX = 64
+# Writer connection id -> after-commit callbacks registered by the job currently running on it
+_after_commit = {}
+
+def connect(path, read_only=False):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS: conn.execute(pragma)
+    # Readers refuse writes outright, so a stray UPDATE can't bypass the writer queue
+    if read_only: conn.execute("PRAGMA query_only=ON")
+    return conn
+
+def after_commit(conn, fn):
+    """Runs fn() once the current writer job's changes are committed; dropped if the job rolls back.
+    For side effects outside SQLite (files, caches) that must not get ahead of the database.
+    On a connection that isn't a Database writer, fn runs right away (the caller owns the commit)."""
+    hooks = _after_commit.get(id(conn))
+    if hooks is None: fn()
+    else: hooks.append(fn)
+
+class Database:
+    """One SQLite file behind per-thread read connections and a single serialized writer.
+
+    Reads: `reader()` hands each thread its own connection, so concurrent Streamlit sessions
+    never share a cursor. Writes: `write(fn)` queues `fn(conn)` for the writer thread, which
+    drains whatever is waiting (up to WRITE_BATCH_MAX jobs) into one transaction and commits
+    once. Each job runs under its own SAVEPOINT, so a failing job rolls back alone and its
+    exception is re-raised in the caller. Jobs must not call conn.commit(); side effects outside the
+    database go through after_commit(), which runs them after COMMIT and before the callers resume.
+    """
+    def __init__(self, path, setup=None):
+        self.path = path
+        self.local = threading.local()
+        self.jobs = queue.Queue()
+        self.stats = {"jobs": 0, "commits": 0, "failed": 0, "hook_errors": 0}
+        self.write_conn = connect(path)
+        # Schema/migrations run once on the writer connection before it starts taking jobs
+        if setup:
+            ready = Future()
+            self._run_batch([(setup, ready)])
+            ready.result()
+        self.thread = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self.thread.start()
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path, read_only=True)
+        return conn
+
+    def submit(self, fn):
+        """Queues fn(conn) on the writer. Returns a Future resolved after the batch commits."""
+        future = Future()
+        self.jobs.put((fn, future))
+        return future
+
+    def write(self, fn):
+        """Runs fn(conn) on the writer and blocks until it is committed. Returns fn's result."""
+        return self.submit(fn).result()
+
+    def execute(self, sql, params=()):
+        """Single write statement. Returns (lastrowid, rowcount)."""
+        def job(conn):
+            cursor = conn.execute(sql, params)
+            return cursor.lastrowid, cursor.rowcount
+        return self.write(job)
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < WRITE_BATCH_MAX:
+                try: batch.append(self.jobs.get_nowait())
+                except queue.Empty: break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        conn = self.write_conn
+        outcomes, hooks = [], []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future in batch:
+                conn.execute("SAVEPOINT job")
+                _after_commit[id(conn)] = job_hooks = []
+                try:
+                    outcomes.append((future, fn(conn), None))
+                    conn.execute("RELEASE job")
+                    hooks.extend(job_hooks)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job"); conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+                finally:
+                    _after_commit.pop(id(conn), None)
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction: conn.execute("ROLLBACK")
+            for _, future in batch: future.set_exception(e)
+            self.stats["failed"] += len(batch)
+            return
+        self.stats["commits"] += 1
+        for fn in hooks:
+            # Committed already: a failed side effect can't undo the write, so it doesn't fail the job
+            try: fn()
+            except Exception: self.stats["hook_errors"] += 1
+        for future, result, error in outcomes:
+            self.stats["jobs"] += 1
+            if error is None: future.set_result(result)
+            else:
+                self.stats["failed"] += 1
+                future.set_exception(error)
@@ -0,0 +1,161 @@
+import io
+import os
+import copy
+import json
+import hashlib
+import zipfile
+import threading
+import streamlit as st
+import docx
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+import db_engine
+import cache_engine
+import pool_engine
+
+RESUME_TEMPLATE = "WSO Academy Resume Template.docx"
+RESUME_TEMPLATE_DEAL = "WSO Academy Resume Template - Deal Experience.docx"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+DOCX_CACHE_MAX_ENTRIES = 64
+
+def resume_template(is_experienced):
+    return RESUME_TEMPLATE_DEAL if is_experienced else RESUME_TEMPLATE
+
+def template_available(template_path):
+    return os.path.exists(template_path)
+
+# --- TEMPLATE REGISTRY ---
+class _CompilingEnvironment(Environment):
+    """docxtpl calls from_string() on every XML part of every render. The pristine template always
+    produces the same source strings, so each one is compiled once and reused."""
+    def __init__(self):
+        super().__init__()
+        self.compiled = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        template = self.compiled.get(source)
+        if template is None:
+            template = self.compiled[source] = super().from_string(source, globals, template_class)
+        return template
+
+class LoadedTemplate:
+    """One template file parsed once: a pristine python-docx Document (never rendered into)
+    plus the Jinja environment holding its compiled parts."""
+    def __init__(self, path, stamp, data):
+        self.path = path
+        self.stamp = stamp
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.document = docx.Document(io.BytesIO(data))
+        self.jinja_env = _CompilingEnvironment()
+
+    def render(self, context):
+        doc = DocxTemplate(self.path)
+        # Render into a deep copy of the parsed document instead of re-reading the .docx
+        doc.docx = copy.deepcopy(self.document)
+        doc.render(context, jinja_env=self.jinja_env)
+        bio = io.BytesIO()
+        doc.save(bio)
+        return bio.getvalue()
+
+class TemplateRegistry:
+    """Process-wide templates keyed by path; an entry is reloaded when the file's (mtime, size) changes."""
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.stamp == stamp: return entry
+        with open(path, "rb") as f: entry = LoadedTemplate(path, stamp, f.read())
+        with self.lock: self.entries[path] = entry
+        return entry
+
+@st.cache_resource
+def get_template_registry():
+    return TemplateRegistry()
+
+# --- RENDER CACHE ---
+def render_key(template, context):
+    """Cache key over the loaded template's content hash and the canonical JSON of the render context."""
+    payload = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(f"{template.digest}\n{payload}".encode("utf-8")).hexdigest()
+
+@st.cache_resource
+def get_docx_cache():
+    # Process-wide LRU of rendered .docx bytes keyed by render_key
+    return cache_engine.LRUCache(DOCX_CACHE_MAX_ENTRIES)
+
+def render_docx(template_path, context):
+    """Renders a docxtpl template to bytes. Repeat requests for the same (template, context) are served
+    from the cache; a changed template file or resume JSON gives a new key."""
+    template = get_template_registry().get(template_path)
+    key = render_key(template, context)
+    cache = get_docx_cache()
+    data = cache.get(key)
+    if data is None:
+        data = template.render(context)
+        cache.put(key, data)
+    return data
+
+# --- BATCH RENDERING ---
+def render_zip(jobs):
+    """Renders [(filename, template_path, context)] into one ZIP. Returns (zip_bytes, {filename: error}).
+
+    Cache hits are taken in-process; the rest fan out over the shared process pool (rendering is pure-Python
+    XML work, so processes are what scale it). Files keep their input order inside the archive and
+    any that failed are listed in RENDER_ERRORS.txt.
+    """
+    jobs = list(jobs)
+    rendered = [None] * len(jobs)
+    errors = {}
+    pending = []
+    cache = get_docx_cache()
+    registry = get_template_registry()
+    for idx, (filename, template_path, context) in enumerate(jobs):
+        try: key = render_key(registry.get(template_path), context)
+        except OSError as e:
+            errors[filename] = str(e)
+            continue
+        rendered[idx] = cache.get(key)
+        if rendered[idx] is None: pending.append((idx, key, template_path, context))
+
+    for pos, outcome in pool_engine.run_many(render_docx, [(template_path, context) for _, _, template_path, context in pending]):
+        idx, key, _, _ = pending[pos]
+        _collect(rendered, errors, cache, jobs, idx, key, outcome)
+
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as archive:
+        for (filename, _, _), data in zip(jobs, rendered):
+            if data is not None: archive.writestr(filename, data)
+        if errors: archive.writestr("RENDER_ERRORS.txt", "\n".join(f"{name}: {error}" for name, error in errors.items()))
+    return bio.getvalue(), errors
+
+def _collect(rendered, errors, cache, jobs, idx, key, outcome):
+    data, error = outcome
+    if error is not None:
+        errors[jobs[idx][0]] = error
+        return
+    rendered[idx] = data
+    cache.put(key, data)
+
+def drafts_zip(db_path, start, end):
+    """ZIP of the latest draft of every client with a session in [start, end].
+
+    Uses its own read-only connection, so it is safe to call from st.download_button's
+    deferred-data thread (nothing is rendered until somebody clicks).
+    """
+    conn = db_engine.connect(db_path, read_only=True)
+    try:
+        rows = conn.execute("SELECT id, student, is_experienced, latest_resume_json FROM clients WHERE session_date BETWEEN ? AND ? AND latest_resume_json IS NOT NULL ORDER BY session_date, time",
+                            (str(start), str(end))).fetchall()
+    finally:
+        conn.close()
+    jobs = []
+    for client_id, student, is_experienced, resume_json in rows:
+        try: context = json.loads(resume_json)
+        except (TypeError, ValueError): continue
+        jobs.append((f"WSO_Draft_{student}_{client_id}.docx", resume_template(is_experienced == 1), context))
+    return render_zip(jobs)[0]
@@ -0,0 +1,99 @@
+import gzip
+import io
+import zipfile
+import pandas as pd
+import db_engine
+
+# Parquet is optional: the format is only offered when pyarrow is installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_CHUNK_ROWS = 2000
+# Tables in a backup: client rows plus the history / mock tables keyed by clients.id
+EXPORT_TABLES = ["clients", "session_events", "mock_scores"]
+ALL_TABLES = "ALL TABLES (ZIP)"
+# Bookkeeping columns that mean nothing outside this app
+INTERNAL_COLUMNS = {"row_version", "history_migrated", "mocks_migrated"}
+# Full-text columns left out of the default selection (resumes, overlays, JSON logs)
+HEAVY_COLUMNS = {"resume_text", "session_kb_text", "latest_resume_json", "stories_log"}
+# Pre-migration blobs, no longer written: history lives in session_events, mocks in mock_scores
+LEGACY_COLUMNS = {"history", "mock_data"}
+
+EXPORT_FORMATS = {
+    "CSV (gzip)": {"ext": "csv.gz", "mime": "application/gzip"},
+    "CSV": {"ext": "csv", "mime": "text/csv"},
+}
+if pq is not None:
+    EXPORT_FORMATS["Parquet"] = {"ext": "parquet", "mime": "application/vnd.apache.parquet"}
+
+def exportable_columns(conn, table="clients"):
+    """[(name, declared_type)] in table order, minus internal bookkeeping columns."""
+    return [(r[1], (r[2] or "").upper()) for r in conn.execute(f"PRAGMA table_info({table})").fetchall() if r[1] not in INTERNAL_COLUMNS]
+
+def default_columns(conn, table="clients"):
+    return [name for name, _ in exportable_columns(conn, table) if name not in HEAVY_COLUMNS | LEGACY_COLUMNS]
+
+def column_label(name):
+    return f"{name} (legacy)" if name in LEGACY_COLUMNS else name
+
+def iter_chunks(conn, columns, table="clients", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields DataFrames of `chunk_rows` rows, so only one chunk of the table is in memory at a time."""
+    known = {name for name, _ in exportable_columns(conn, table)}
+    unknown = [c for c in columns if c not in known]
+    if unknown: raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    select = ", ".join(f'"{c}"' for c in columns)
+    yield from pd.read_sql_query(f"SELECT {select} FROM {table} ORDER BY id", conn, chunksize=chunk_rows)
+
+def write_csv(conn, columns, fileobj, compress=True, table="clients"):
+    out = gzip.GzipFile(fileobj=fileobj, mode="wb") if compress else fileobj
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    header = True
+    for chunk in iter_chunks(conn, columns, table):
+        chunk.to_csv(text, index=False, header=header)
+        header = False
+    if header: pd.DataFrame(columns=columns).to_csv(text, index=False)
+    text.flush(); text.detach()
+    if compress: out.close()
+
+def write_parquet(conn, columns, fileobj, table="clients"):
+    if pq is None: raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    # Schema from the declared SQLite types, so chunks with all-NULL columns still line up
+    declared = dict(exportable_columns(conn, table))
+    types = {c: pa.int64() if "INT" in declared[c] else pa.float64() if "REAL" in declared[c] else pa.string() for c in columns}
+    schema = pa.schema(list(types.items()))
+    with pq.ParquetWriter(fileobj, schema, compression="snappy") as writer:
+        for chunk in iter_chunks(conn, columns, table):
+            for c in columns:
+                if types[c] == pa.string(): chunk[c] = chunk[c].where(chunk[c].isna(), chunk[c].astype(str))
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def write_table(conn, columns, fmt, fileobj, table="clients"):
+    if fmt == "Parquet": write_parquet(conn, columns, fileobj, table)
+    else: write_csv(conn, columns, fileobj, compress=(fmt == "CSV (gzip)"), table=table)
+
+def build_export(db_path, columns, fmt, table="clients"):
+    """Streams the selected columns of `table` through the chosen writer and returns the file as bytes.
+
+    Uses its own read-only connection, so it is safe to call from st.download_button's
+    deferred-data thread (the export is only built when somebody clicks).
+    """
+    out = io.BytesIO()
+    conn = db_engine.connect(db_path, read_only=True)
+    try: write_table(conn, columns, fmt, out, table)
+    finally: conn.close()
+    return out.getvalue()
+
+def build_backup(db_path, fmt, tables=EXPORT_TABLES):
+    """Every exportable column (minus the legacy blobs) of every backup table, one file per table in a ZIP (bytes)."""
+    out = io.BytesIO()
+    conn = db_engine.connect(db_path, read_only=True)
+    try:
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED if fmt != "CSV" else zipfile.ZIP_DEFLATED) as archive:
+            for table in tables:
+                with archive.open(f"{table}.{EXPORT_FORMATS[fmt]['ext']}", "w") as member:
+                    write_table(conn, [name for name, _ in exportable_columns(conn, table) if name not in LEGACY_COLUMNS], fmt, member, table)
+    finally: conn.close()
+    return out.getvalue()
@@ -0,0 +1,109 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+IMPORT_CHUNK_ROWS = 1000
+# Optional CSV column that identifies a client across re-imports (CRM id, email, ...)
+IMPORT_ID_COLUMN = "Client ID"
+IMPORT_FIELDS = ["import_key", "student", "session_date", "time", "type", "strengths", "focus", "mock_tech", "mock_beh", "history"]
+
+def _text(df, column, default):
+    if column not in df: return pd.Series(default, index=df.index, dtype=object)
+    return df[column].fillna(default).astype(str)
+
+def _score(df, column):
+    """(scores as float with blanks -> 0, mask of cells that were present but not numeric)."""
+    if column not in df: return pd.Series(0.0, index=df.index), pd.Series(False, index=df.index)
+    scores = pd.to_numeric(df[column], errors="coerce")
+    return scores.fillna(0.0).astype(float), scores.isna() & df[column].notna()
+
+def normalize_import(df, today_str):
+    """CSV frame -> one row per client with IMPORT_FIELDS, built column-wise (no per-row Python).
+
+    import_key is 'id:<Client ID>' when the CSV has that column filled, else None: names aren't unique,
+    so a row without an id is always a new client. Repeated ids within one file keep the last row
+    (len(df) - len(result) rows were merged that way).
+    """
+    out = pd.DataFrame(index=df.index)
+    out["student"] = _text(df, "Student Name", "Unknown").str.strip().str.upper()
+    out["session_date"] = today_str
+    out["type"] = _text(df, "Session Type", "General")
+    out["time"] = np.where(out["type"].str.contains("Resume", regex=False), "Async", "09:00")
+    out["strengths"] = _text(df, "Strengths", "Imported")
+    out["focus"] = _text(df, "Weaknesses", "Imported")
+    out["history"] = _text(df, "History", "Imported via CSV.")
+
+    # Mock scores: blanks count as 0, a non-numeric score voids the row's entry,
+    # and only rows with a non-zero score get one (NaN = no mock)
+    tech, tech_bad = _score(df, "Mock Score (Tech)")
+    beh, beh_bad = _score(df, "Mock Score (Beh)")
+    has_mock = ((tech > 0) | (beh > 0)) & ~tech_bad & ~beh_bad
+    out["mock_tech"] = tech.where(has_mock)
+    out["mock_beh"] = beh.where(has_mock)
+
+    out["import_key"] = None
+    if IMPORT_ID_COLUMN in df:
+        ids = df[IMPORT_ID_COLUMN].fillna("").astype(str).str.strip()
+        out["import_key"] = ("id:" + ids).where(ids != "", None)
+    keyed = out["import_key"].notna()
+    out = out[~keyed | ~out["import_key"].duplicated(keep="last")]
+    return out[IMPORT_FIELDS].reset_index(drop=True)
+
+def upsert_clients(conn, frame, progress=None):
+    """Writes a normalize_import() frame in one transaction (run it as a single write job).
+
+    Rows are staged with chunked executemany, then upserted on clients.import_key in one statement:
+    re-importing a file with Client IDs updates those clients instead of duplicating them. Details and
+    type are refreshed; schedule is kept, and the file's mock score is only added for clients that have
+    no mocks yet. Rows without an id are inserted as new clients. New clients get an 'Imported' event.
+    `progress(done, total)` fires after each staged chunk. Returns {'inserted': n, 'updated': n}, where
+    updated only counts matched clients whose details actually changed.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_stage (row_no INTEGER PRIMARY KEY, import_key TEXT UNIQUE, student TEXT, session_date TEXT, time TEXT, type TEXT, strengths TEXT, focus TEXT, mock_tech REAL, mock_beh REAL, history TEXT, is_new INTEGER DEFAULT 0, client_id INTEGER)")
+    conn.execute("DELETE FROM import_stage")
+    total = len(frame)
+    insert_sql = f"INSERT INTO import_stage ({', '.join(IMPORT_FIELDS)}) VALUES ({', '.join('?' * len(IMPORT_FIELDS))})"
+    for start in range(0, total, IMPORT_CHUNK_ROWS):
+        chunk = frame.iloc[start:start + IMPORT_CHUNK_ROWS]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        conn.executemany(insert_sql, chunk.itertuples(index=False, name=None))
+        if progress: progress(min(start + IMPORT_CHUNK_ROWS, total), total)
+
+    conn.execute("UPDATE import_stage SET is_new = 1 WHERE import_key IS NULL OR import_key NOT IN (SELECT import_key FROM clients WHERE import_key IS NOT NULL)")
+    inserted = conn.execute("SELECT COUNT(*) FROM import_stage WHERE is_new = 1").fetchone()[0]
+
+    # Rows with an id: upsert, skipping clients the file doesn't change (rowcount = inserts + real updates)
+    upserted = conn.execute("""
+        INSERT INTO clients (import_key, student, session_date, time, type, strengths, focus, resume_text, is_experienced)
+        SELECT import_key, student, session_date, time, type, strengths, focus, '', 0 FROM import_stage WHERE import_key IS NOT NULL
+        ON CONFLICT (import_key) WHERE import_key IS NOT NULL DO UPDATE SET
+            student = excluded.student, type = excluded.type, strengths = excluded.strengths, focus = excluded.focus
+        WHERE (student, type, strengths, focus) IS NOT (excluded.student, excluded.type, excluded.strengths, excluded.focus)
+    """).rowcount
+    updated = upserted - conn.execute("SELECT COUNT(*) FROM import_stage WHERE is_new = 1 AND import_key IS NOT NULL").fetchone()[0]
+    conn.execute("UPDATE import_stage SET client_id = (SELECT id FROM clients c WHERE c.import_key = import_stage.import_key) WHERE import_key IS NOT NULL")
+
+    # Rows without an id: plain inserts, matched back to their stage rows by order (ids are assigned ascending)
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM clients").fetchone()[0]
+    conn.execute("""
+        INSERT INTO clients (student, session_date, time, type, strengths, focus, resume_text, is_experienced)
+        SELECT student, session_date, time, type, strengths, focus, '', 0 FROM import_stage WHERE import_key IS NULL ORDER BY row_no
+    """)
+    conn.execute("""
+        WITH staged AS (SELECT row_no, ROW_NUMBER() OVER (ORDER BY row_no) AS n FROM import_stage WHERE import_key IS NULL),
+             created AS (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS n FROM clients WHERE id > ?)
+        UPDATE import_stage SET client_id = (SELECT c.id FROM staged s JOIN created c USING (n) WHERE s.row_no = import_stage.row_no)
+        WHERE import_key IS NULL
+    """, (last_id,))
+
+    conn.execute("""
+        INSERT INTO mock_scores (client_id, mock_date, tech, beh, notes)
+        SELECT s.client_id, s.session_date, s.mock_tech, s.mock_beh, 'Imported Historical Data' FROM import_stage s
+        WHERE s.mock_tech IS NOT NULL AND NOT EXISTS (SELECT 1 FROM mock_scores m WHERE m.client_id = s.client_id)
+    """)
+    conn.execute("""
+        INSERT INTO session_events (client_id, created_at, event_type, notes)
+        SELECT client_id, ?, 'Imported', history FROM import_stage WHERE is_new = 1
+    """, (datetime.datetime.now().isoformat(timespec="seconds"),))
+    conn.execute("DELETE FROM import_stage")
+    return {"inserted": inserted, "updated": updated}
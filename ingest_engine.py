@@ -0,0 +1,121 @@
+import io
+import time
+import hashlib
+import streamlit as st
+from pypdf import PdfReader
+import docx
+import cache_engine
+import pool_engine
+
+SUPPORTED_TYPES = ("pdf", "docx", "txt", "csv")
+PARSE_CACHE_MAX_ENTRIES = 128
+
+def file_kind(filename):
+    ext = (filename or "").lower().rsplit(".", 1)[-1]
+    return ext if ext in SUPPORTED_TYPES else None
+
+def iter_pages(kind, data):
+    """Yields (page_number, page_count, text) one page at a time. PDFs are parsed lazily
+    page by page; the other types come back as a single page."""
+    if kind == "pdf":
+        reader = PdfReader(io.BytesIO(data))
+        page_count = len(reader.pages)
+        for idx, page in enumerate(reader.pages, start=1):
+            yield idx, page_count, page.extract_text() or ""
+    elif kind == "docx":
+        yield 1, 1, _docx_text(data)
+    elif kind in ("txt", "csv"):
+        yield 1, 1, data.decode("utf-8", errors="replace")
+
+def _docx_text(data):
+    doc = docx.Document(io.BytesIO(data))
+    full_text = [p.text for p in doc.paragraphs]
+    # Tables: merged cells repeat the same cell object across a row, so read each once
+    for table in doc.tables:
+        for row in table.rows:
+            seen_cells = set()
+            for cell in row.cells:
+                if cell not in seen_cells:
+                    seen_cells.add(cell)
+                    full_text.extend(p.text for p in cell.paragraphs)
+    return "\n".join(full_text)
+
+def _parse(filename, data, digest, progress=None):
+    kind = file_kind(filename)
+    if kind is None: raise ValueError(f"Unsupported file type: {filename}")
+    start = time.perf_counter()
+    pages = []
+    for page_number, page_count, page_text in iter_pages(kind, data):
+        pages.append(page_text)
+        if progress: progress(page_number / page_count)
+    return {
+        "filename": filename,
+        "kind": kind,
+        "text": "\n".join(pages),
+        "pages": len(pages),
+        "seconds": time.perf_counter() - start,
+        "content_hash": digest,
+    }
+
+@st.cache_resource
+def get_parse_cache():
+    # Process-wide LRU of parsed documents keyed by SHA-256 of the file bytes
+    return cache_engine.LRUCache(PARSE_CACHE_MAX_ENTRIES)
+
+def extract_document(filename, data, progress=None):
+    """Parses PDF/DOCX/TXT/CSV bytes into {filename, kind, text, pages, seconds, content_hash, cached}.
+
+    Results are cached per content hash, so Streamlit reruns with the same file sitting in an
+    uploader cost one hash instead of a re-parse. `progress` (0..1 callback) fires per PDF page
+    when the file actually has to be parsed.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    cache = get_parse_cache()
+    cached = cache.get(digest)
+    if cached is not None: return dict(cached, filename=filename, cached=True)
+    result = _parse(filename, data, digest, progress)
+    cache.put(digest, result)
+    return dict(result, cached=False)
+
+def read_upload(uploaded_file, progress=None):
+    """extract_document for a Streamlit UploadedFile."""
+    return extract_document(uploaded_file.name, uploaded_file.getvalue(), progress)
+
+def extract_many(files, progress=None):
+    """Parses many (filename, bytes) pairs, fanning cache misses out over the shared process pool.
+
+    pypdf is pure Python and CPU-bound, so separate processes are what scale it across cores.
+    Results are returned in input (upload) order. `progress(done, total, result)` fires as each
+    file finishes. Failed files come back with an 'error' key and empty text.
+    """
+    files = list(files)
+    results = [None] * len(files)
+    cache = get_parse_cache()
+    pending = []
+    done = 0
+    for idx, (filename, data) in enumerate(files):
+        digest = hashlib.sha256(data).hexdigest()
+        cached = cache.get(digest)
+        if cached is not None:
+            results[idx] = dict(cached, filename=filename, cached=True)
+            done += 1
+            if progress: progress(done, len(files), results[idx])
+        else:
+            pending.append((idx, filename, data, digest))
+
+    # Cached files are done already; the rest go to the shared process pool (in-process for a single file)
+    for pos, outcome in pool_engine.run_many(_parse, [(filename, data, digest) for _, filename, data, digest in pending]):
+        idx, filename, _, digest = pending[pos]
+        done = _collect(results, cache, (idx, filename, digest), outcome, done, len(files), progress)
+    return results
+
+def _collect(results, cache, item, outcome, done, total, progress):
+    (idx, filename, digest), (result, error) = item, outcome
+    if error is None: cache.put(digest, result)
+    else:
+        # Failed files come back with empty text and the error message
+        result = {"filename": filename, "kind": file_kind(filename), "text": "", "pages": 0, "seconds": 0.0, "content_hash": digest, "error": error}
+    results[idx] = dict(result, cached=False)
+    done += 1
+    if progress: progress(done, total, results[idx])
+    return done
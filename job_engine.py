@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pool_engine
+
+# Worker threads for I/O-bound jobs (AI calls); CPU-bound ones (rendering) go to pool_engine's shared process pool
+JOB_WORKERS = int(os.environ.get("MENTOROS_JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = 0.5
+JOB_MAX_ATTEMPTS = 5
+# Retry n waits JOB_BACKOFF_SECONDS * 2**(n-1) (capped), with +/-25% jitter so retries don't stampede
+JOB_BACKOFF_SECONDS = 2.0
+JOB_BACKOFF_MAX_SECONDS = 120.0
+# Finished jobs (and their results) are kept this long for polling, then pruned on start
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "failed", "cancelled")
+
+def _in(values):
+    # "IN (?, ?)" for bound statuses (a Python tuple repr isn't valid SQL for one element)
+    return f"IN ({', '.join('?' * len(values))})"
+
+# kind -> {"fn", "pool", "retry_on", "on_done"}
+HANDLERS = {}
+
+def handler(kind, pool="thread", retry_on=(), on_done=None):
+    """Registers fn(payload) -> result as the handler for `kind`. Results may be JSON-able or bytes.
+    pool='process' runs it on the shared process pool (fn must be a module-level function). Exceptions in
+    `retry_on` requeue the job with exponential backoff; anything else fails it.
+    Handlers should not write app data themselves: on_done(conn, payload, result) runs in the same
+    writer job that marks the job done, and only if it wasn't cancelled meanwhile."""
+    def register(fn):
+        HANDLERS[kind] = {"fn": fn, "pool": pool, "retry_on": tuple(retry_on), "on_done": on_done}
+        return fn
+    return register
+
+class JobFailed(Exception):
+    pass
+
+def ensure_schema(conn):
+    """Jobs table (runs inside the schema setup job: one statement per execute, no commits)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            job_key TEXT,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_after REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            result_blob BLOB,
+            error TEXT,
+            created_at REAL,
+            updated_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key)")
+
+class JobQueue:
+    """SQLite-backed job queue drained by one dispatcher thread into a thread pool / the shared process pool.
+
+    State lives in the jobs table, so a page can submit, poll, fetch and cancel by id across reruns
+    and sessions. Jobs with the same `key` are deduplicated: while one is queued, running or done,
+    submitting again returns its id instead of doing the work twice. All state changes go through
+    the Database writer; polling uses the caller's reader.
+    """
+    def __init__(self, db, workers=JOB_WORKERS):
+        self.db = db
+        self.workers = workers
+        self.threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.running = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        now = time.time()
+        # Jobs left running by a previous process never finished: run them again
+        def recover(conn):
+            conn.execute("UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (now,))
+            conn.execute(f"DELETE FROM jobs WHERE status {_in(FINISHED)} AND updated_at < ?", (*FINISHED, now - JOB_RETENTION_SECONDS))
+        db.write(recover)
+        self.thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self.thread.start()
+
+    # --- PUBLIC API ---
+    def submit(self, kind, payload=None, key=None, reuse_done=True, max_attempts=JOB_MAX_ATTEMPTS):
+        """Queues a job and returns its id (or the id of the matching queued / running / done job)."""
+        if kind not in HANDLERS: raise ValueError(f"No handler registered for job kind '{kind}'")
+        statuses = ACTIVE + ("done",) if reuse_done else ACTIVE
+        def job(conn):
+            if key is not None:
+                row = conn.execute(f"SELECT id FROM jobs WHERE job_key = ? AND status {_in(statuses)} ORDER BY id DESC LIMIT 1",
+                                   (key, *statuses)).fetchone()
+                if row is not None: return row[0]
+            now = time.time()
+            return conn.execute("INSERT INTO jobs (kind, job_key, payload, max_attempts, run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (kind, key, json.dumps(payload), max_attempts, now, now, now)).lastrowid
+        job_id = self.db.write(job)
+        self.wake.set()
+        return job_id
+
+    def poll(self, job_id, conn=None):
+        """{'id', 'kind', 'status', 'attempts', 'max_attempts', 'run_after', 'error'} or None."""
+        row = (conn or self.db.reader()).execute("SELECT id, kind, status, attempts, max_attempts, run_after, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id, timeout=None, conn=None):
+        """The job's result once done. Waits up to `timeout` seconds (None = don't wait);
+        raises JobFailed if it failed or was cancelled, TimeoutError if it is still pending."""
+        deadline = time.time() + (timeout or 0)
+        conn = conn or self.db.reader()
+        while True:
+            row = conn.execute("SELECT status, result, result_blob, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None: raise JobFailed(f"Unknown job {job_id}")
+            if row['status'] == "done": return row['result_blob'] if row['result_blob'] is not None else json.loads(row['result'])
+            if row['status'] in ("failed", "cancelled"): raise JobFailed(row['error'] or row['status'])
+            if time.time() >= deadline: raise TimeoutError(f"Job {job_id} is still {row['status']}")
+            time.sleep(min(JOB_POLL_SECONDS / 5, max(deadline - time.time(), 0)))
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. A running thread job can't be interrupted: it finishes,
+        but its result is discarded. Returns False if the job had already finished."""
+        now = time.time()
+        rowcount = self.db.execute(f"UPDATE jobs SET status = 'cancelled', error = 'Cancelled', updated_at = ? WHERE id = ? AND status {_in(ACTIVE)}", (now, job_id, *ACTIVE))[1]
+        return rowcount > 0
+
+    # --- DISPATCH ---
+    def _dispatch_loop(self):
+        while True:
+            self.wake.wait(JOB_POLL_SECONDS)
+            self.wake.clear()
+            try: self._dispatch()
+            except Exception: time.sleep(JOB_POLL_SECONDS)
+
+    def _dispatch(self):
+        with self.lock: free = self.workers - len(self.running)
+        if free <= 0: return
+        now = time.time()
+        # Cheap read first, so an idle queue never takes the write lock
+        due = self.db.reader().execute("SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= ? LIMIT 1", (now,)).fetchone()
+        if due is None: return
+        def claim(conn):
+            rows = conn.execute("SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY run_after, id LIMIT ?",
+                                (now, free)).fetchall()
+            conn.executemany("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?", [(now, row['id']) for row in rows])
+            return [dict(row, attempts=row['attempts'] + 1) for row in rows]
+        for job in self.db.write(claim): self._start(job)
+
+    def _start(self, job):
+        spec = HANDLERS.get(job['kind'])
+        if spec is None:
+            self._finish(job, error=f"No handler registered for job kind '{job['kind']}'")
+            return
+        payload = json.loads(job['payload']) if job['payload'] else None
+        with self.lock: self.running.add(job['id'])
+        pool = pool_engine.get_pool() if spec['pool'] == "process" else self.threads
+        try: future = pool.submit(spec['fn'], payload)
+        except BrokenProcessPool as e:
+            self._done(job, spec, None, pool, e)
+            return
+        future.add_done_callback(lambda f: self._done(job, spec, f, pool))
+
+    def _done(self, job, spec, future, pool, error=None):
+        try:
+            if future is not None: error = future.exception()
+            # A worker died (OOM, segfault): replace the shared pool, then retry the job on the new one
+            if isinstance(error, BrokenProcessPool): pool_engine.reset_pool(pool)
+            if error is None: self._finish(job, result=future.result(), on_done=spec['on_done'])
+            elif isinstance(error, spec['retry_on'] + (BrokenProcessPool,)) and job['attempts'] < job['max_attempts']: self._retry(job, error)
+            else: self._finish(job, error=f"{type(error).__name__}: {error}")
+        finally:
+            with self.lock: self.running.discard(job['id'])
+            self.wake.set()
+
+    def _finish(self, job, result=None, error=None, on_done=None):
+        blob = result if isinstance(result, (bytes, bytearray)) else None
+        text = None if blob is not None or error is not None else json.dumps(result)
+        def finish(conn):
+            # status guard: a job cancelled while running keeps 'cancelled', and its result is not persisted
+            updated = conn.execute("UPDATE jobs SET status = ?, result = ?, result_blob = ?, error = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                                   ("failed" if error is not None else "done", text, blob, error, time.time(), job['id'])).rowcount
+            if updated and error is None and on_done is not None:
+                on_done(conn, json.loads(job['payload']) if job['payload'] else None, result)
+        try: self.db.write(finish)
+        except Exception as e:
+            # on_done failed and rolled back with the status update: record the job as failed instead
+            if error is None: self._finish(job, error=f"{type(e).__name__}: {e}")
+
+    def _retry(self, job, error):
+        delay = min(JOB_BACKOFF_SECONDS * 2 ** (job['attempts'] - 1), JOB_BACKOFF_MAX_SECONDS) * random.uniform(0.75, 1.25)
+        self.db.execute("UPDATE jobs SET status = 'queued', run_after = ?, error = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                        (time.time() + delay, f"{type(error).__name__}: {error} (retrying)", time.time(), job['id']))
@@ -1,14 +1,16 @@
 import streamlit as st
 import utils
-import json
+import ingest_engine
+import vault_engine
+import vector_engine
+import export_engine
+import calendar_engine
+import document_engine
+import report_engine
 import pandas as pd
 import altair as alt
 import datetime
 import calendar
-import io
-from docxtpl import DocxTemplate
-from pypdf import PdfReader
-import docx
 
 # --- INITIALIZATION ---
 st.set_page_config(page_title="WSO Mentor OS", layout="wide", initial_sidebar_state="expanded")
@@ -19,17 +21,8 @@ utils.init_db()
 def update_session_time(client_id, new_date, new_time):
     """Updates only the date/time for a specific client ID from the calendar."""
     try:
-        conn = utils.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE clients SET session_date = ?, time = ? WHERE id = ?", (new_date, new_time, client_id))
-        conn.commit()
-        
-        # Update Session State instantly
-        for c in st.session_state['client_db']:
-            if c['id'] == client_id:
-                c['session_date'] = new_date
-                c['time'] = new_time
-                break
+        # Updates the row by id and patches session state in place
+        utils.update_client(client_id, session_date=new_date, time=new_time)
         st.toast("✅ Schedule Updated!")
         st.rerun()
     except Exception as e:
@@ -45,141 +38,167 @@ def get_session_style(session_type):
     if "Networking" in session_type: return "🟣", "Networking"
     return "⚪", "General"
 
-def render_compact_calendar(client_db):
-    if 'cal_year' not in st.session_state:
-        st.session_state['cal_year'] = datetime.date.today().year
-    if 'cal_month' not in st.session_state:
-        st.session_state['cal_month'] = datetime.date.today().month
+def render_slot(sess, label, session_date):
+    # The quick-edit form is only built once the popover is actually opened
+    slot = st.popover(label, use_container_width=True, key=f"slot_{sess['id']}", on_change="rerun")
+    if not slot.open: return
+    with slot:
+        st.markdown(f"**{sess['student']}**")
+        st.caption(sess['type'])
+
+        with st.form(key=f"q_edit_{sess['id']}"):
+            # Parse existing time
+            try:
+                curr_time = datetime.datetime.strptime(sess.get('time') or '09:00', "%H:%M").time()
+            except: curr_time = datetime.time(9,0)
+
+            new_d = st.date_input("Date", value=session_date)
+            new_t = st.time_input("Time", value=curr_time)
+
+            if st.form_submit_button("Update Slot"):
+                update_session_time(sess['id'], new_d.strftime("%Y-%m-%d"), new_t.strftime("%H:%M"))
+
+def render_compact_calendar():
+    if 'cal_anchor' not in st.session_state:
+        st.session_state['cal_anchor'] = datetime.date.today()
+    view = st.session_state.get('cal_view', "Month")
+    anchor = st.session_state['cal_anchor']
 
     # Navigation
-    c_prev, c_month, c_next, c_legend = st.columns([0.5, 2, 0.5, 4])
+    c_prev, c_month, c_next, c_view, c_legend = st.columns([0.5, 2, 0.5, 2, 3])
     with c_prev:
         if st.button("◀", key="cal_prev", use_container_width=True):
-            st.session_state['cal_month'] -= 1
-            if st.session_state['cal_month'] == 0:
-                st.session_state['cal_month'] = 12
-                st.session_state['cal_year'] -= 1
+            st.session_state['cal_anchor'] = calendar_engine.shift(view, anchor, -1)
             st.rerun()
     with c_next:
         if st.button("▶", key="cal_next", use_container_width=True):
-            st.session_state['cal_month'] += 1
-            if st.session_state['cal_month'] == 13:
-                st.session_state['cal_month'] = 1
-                st.session_state['cal_year'] += 1
+            st.session_state['cal_anchor'] = calendar_engine.shift(view, anchor, 1)
             st.rerun()
     with c_month:
-        month_name = calendar.month_name[st.session_state['cal_month']]
-        st.markdown(f"#### {month_name} {st.session_state['cal_year']}")
+        st.markdown(f"#### {calendar_engine.view_title(view, anchor)}")
+    with c_view:
+        st.radio("VIEW", calendar_engine.VIEWS, key="cal_view", horizontal=True, label_visibility="collapsed")
     with c_legend:
         st.caption("🔴 Mock | 🔵 Resume | 🟢 Roadmap | 🟠 Stories | 🟣 Network")
 
-    # Grid
-    cal = calendar.monthcalendar(st.session_state['cal_year'], st.session_state['cal_month'])
     today = datetime.date.today()
-    
+    # Only the visible range, bucketed by day in one pass (range scan on idx_clients_session_date)
+    sessions_by_day = calendar_engine.load_view(utils.get_db_connection(), view, anchor)
+
+    if view == "Day":
+        day_sessions = sessions_by_day.get(anchor.strftime("%Y-%m-%d"), [])
+        if not day_sessions: st.caption("No sessions.")
+        for sess in day_sessions:
+            icon, _ = get_session_style(sess['type'] or "")
+            render_slot(sess, f"{icon} {sess.get('time') or ''} · {sess['student']} · {sess['type']}", anchor)
+        return
+
     cols = st.columns(7)
     days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
     for idx, day in enumerate(days):
         cols[idx].markdown(f"<div style='text-align:center; font-size:0.8em; font-weight:bold; color:#666;'>{day}</div>", unsafe_allow_html=True)
 
-    for week in cal:
+    # Grid: month rows from calendar.monthcalendar (0 = padding), or the single Mon-Sun row of the week
+    if view == "Week":
+        week_start, _ = calendar_engine.view_range(view, anchor)
+        weeks = [[week_start + datetime.timedelta(days=i) for i in range(7)]]
+    else:
+        weeks = [[datetime.date(anchor.year, anchor.month, d) if d else None for d in week] for week in calendar.monthcalendar(anchor.year, anchor.month)]
+
+    for week in weeks:
         cols = st.columns(7)
-        for idx, day in enumerate(week):
+        for idx, current_date_obj in enumerate(week):
             with cols[idx]:
-                if day != 0:
-                    current_date_obj = datetime.date(st.session_state['cal_year'], st.session_state['cal_month'], day)
+                if current_date_obj is not None:
                     current_date_str = current_date_obj.strftime("%Y-%m-%d")
                     is_today = (current_date_obj == today)
                     
-                    day_sessions = [c for c in client_db if c.get('session_date') == current_date_str]
+                    day_sessions = sessions_by_day.get(current_date_str, [])
                     
                     with st.container():
                         num_style = "font-weight:bold; color:#000;" if day_sessions else "color:#aaa;"
                         if is_today: num_style += "text-decoration: underline;"
-                        st.markdown(f"<div style='text-align:right; font-size:0.9em; {num_style} margin-bottom:2px;'>{day}</div>", unsafe_allow_html=True)
+                        st.markdown(f"<div style='text-align:right; font-size:0.9em; {num_style} margin-bottom:2px;'>{current_date_obj.day}</div>", unsafe_allow_html=True)
                         
                         for sess in day_sessions:
-                            icon, _ = get_session_style(sess['type'])
-                            
-                            # POPOVER WITH QUICK EDIT FORM
-                            with st.popover(f"{icon} {sess.get('time', '')}", use_container_width=True):
-                                st.markdown(f"**{sess['student']}**")
-                                st.caption(sess['type'])
-                                
-                                with st.form(key=f"q_edit_{sess['id']}"):
-                                    # Parse existing time
-                                    try:
-                                        curr_time = datetime.datetime.strptime(sess.get('time', '09:00'), "%H:%M").time()
-                                    except: curr_time = datetime.time(9,0)
-                                    
-                                    new_d = st.date_input("Date", value=current_date_obj)
-                                    new_t = st.time_input("Time", value=curr_time)
-                                    
-                                    if st.form_submit_button("Update Slot"):
-                                        update_session_time(sess['id'], new_d.strftime("%Y-%m-%d"), new_t.strftime("%H:%M"))
+                            icon, _ = get_session_style(sess['type'] or "")
+                            label = f"{icon} {sess.get('time') or ''}" + (f" {sess['student']}" if view == "Week" else "")
+                            render_slot(sess, label, current_date_obj)
 
 # --- MAIN APP LOGIC ---
 
-client_db = st.session_state.get('client_db', [])
-pending_resumes = [c for c in client_db if c.get('type') == "Resume Review (Full)" and not c.get('latest_resume_json')]
-pending_count = len(pending_resumes)
+# Counts come straight from SQL; nothing per client is held in session state
+client_count = utils.count_clients()
+pending_count = utils.count_pending_drafts()
 
 # --- SIDEBAR ---
 st.sidebar.markdown("## WSO MENTOR OS")
 st.sidebar.info("NAVIGATE USING THE MENU ABOVE")
 st.sidebar.markdown("---")
-st.sidebar.metric("TOTAL CLIENTS", len(client_db)) 
+st.sidebar.metric("TOTAL CLIENTS", client_count)
+ai_cache = utils.get_response_cache().stats()
+st.sidebar.caption(f"AI CACHE: {ai_cache['hits']} HITS / {ai_cache['misses']} MISSES ({ai_cache['entries']} STORED)")
 
 # --- BANNER ---
 st.markdown('<div class="stoic-banner">"NOT EVERYDAY WILL BE AWESOME, SHOW UP ANYWAY"</div>', unsafe_allow_html=True)
 
 # --- CALENDAR WIDGET ---
-render_compact_calendar(client_db)
+render_compact_calendar()
 st.markdown("---")
 
 # --- EXECUTIVE SUMMARY ---
 st.title("EXECUTIVE BRIEFING")
 col1, col2 = st.columns(2)
-col1.metric("ACTIVE CLIENTS", str(len(client_db)))
+col1.metric("ACTIVE CLIENTS", str(client_count))
 col2.metric("PENDING RESUME DRAFTS", str(pending_count)) 
 st.markdown("---")
 
 # --- DATABASE CRUD HELPERS ---
-def delete_client(student_name):
+def delete_client(client_id, student_name):
     try:
-        conn = utils.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM clients WHERE student = ?", (student_name,))
-        conn.commit()
-        st.session_state['client_db'] = [c for c in st.session_state['client_db'] if c['student'] != student_name]
+        utils.delete_client(client_id)
         st.toast(f"🗑️ DELETED: {student_name}")
         st.rerun()
     except Exception as e: st.error(f"Deletion Failed: {e}")
 
-def update_client_details(original_name, new_name, new_date, new_time, new_reminder, new_type, new_str, new_foc, new_exp, new_resume_text):
+def update_client_details(client_id, new_name, new_date, new_time, new_reminder, new_type, new_str, new_foc, new_exp):
     try:
-        conn = utils.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''UPDATE clients SET student=?, session_date=?, time=?, reminder_freq=?, type=?, strengths=?, focus=?, is_experienced=?, resume_text=? WHERE student=?''', 
-                       (new_name, new_date, new_time, new_reminder, new_type, new_str, new_foc, new_exp, new_resume_text, original_name))
-        conn.commit()
-        for client in st.session_state['client_db']:
-            if client['student'] == original_name:
-                client['student'] = new_name; client['session_date'] = new_date; client['time'] = new_time; client['reminder_freq'] = new_reminder
-                client['type'] = new_type; client['strengths'] = new_str; client['focus'] = new_foc
-                client['is_experienced'] = new_exp; client['resume_text'] = new_resume_text
-                break
+        utils.update_client(client_id, student=new_name, session_date=new_date, time=new_time, reminder_freq=new_reminder,
+                            type=new_type, strengths=new_str, focus=new_foc, is_experienced=new_exp)
         st.success(f"✅ UPDATED: {new_name}")
         st.rerun()
     except Exception as e: st.error(f"Update Failed: {e}")
 
 # --- DASHBOARD TABS ---
+HISTORY_PAGE_SIZE = 10
+DOSSIER_PAGE_SIZE = 20
+CLIENT_LOG_PAGE_SIZE = 500
+
 tab1, tab2, tab3 = st.tabs(["📋 ACTIVE DOSSIERS", "📊 ANALYTICS", "🗄️ MASTER DATABASE & VAULT"])
 
 # TAB 1: ACTIVE DOSSIERS
 with tab1:
-    if not client_db: st.info("No active clients. Go to Intake.")
-    for i, session in enumerate(client_db):
+    if not client_count: st.info("No active clients. Go to Intake.")
+    else:
+        # Every draft for this week's sessions in one archive, rendered on click
+        week_start, week_end = calendar_engine.view_range("Week", datetime.date.today())
+        wc1, wc2 = st.columns(2)
+        wc1.download_button("📦 DOWNLOAD WEEK'S DRAFTS (ZIP)", lambda: document_engine.drafts_zip(utils.DB_PATH, week_start, week_end),
+                            f"WSO_Drafts_{week_start}_{week_end}.zip", "application/zip", key="dl_week_drafts", use_container_width=True)
+        wc2.download_button("🗂️ DOWNLOAD WEEK'S REPORT CARDS (PDF)", lambda: report_engine.week_reports(utils.DB_PATH, week_start, week_end),
+                            f"WSO_Reports_{week_start}_{week_end}.pdf", "application/pdf", key="dl_week_reports", use_container_width=True)
+    # One page of summaries at a time; the heavy columns are read only when a dossier is opened
+    page_count = max(1, -(-client_count // DOSSIER_PAGE_SIZE))
+    dossier_page = min(st.session_state.get('dossier_page', 0), page_count - 1)
+    if page_count > 1:
+        pc1, pc2, pc3 = st.columns([1, 2, 1])
+        if pc1.button("◀ PREV", key="dossier_prev", disabled=dossier_page == 0):
+            st.session_state['dossier_page'] = dossier_page - 1; st.rerun()
+        pc2.caption(f"PAGE {dossier_page + 1} OF {page_count}")
+        if pc3.button("NEXT ▶", key="dossier_next", disabled=dossier_page >= page_count - 1):
+            st.session_state['dossier_page'] = dossier_page + 1; st.rerun()
+    for session in utils.list_clients(limit=DOSSIER_PAGE_SIZE, offset=dossier_page * DOSSIER_PAGE_SIZE):
+        i = session['id']
         st.markdown(f"""
         <div class="metric-card">
             <div style="display:flex; justify-content:space-between; border-bottom:1px solid #000; padding-bottom:10px; margin-bottom:10px;">
@@ -189,34 +208,46 @@ with tab1:
             <div><span style="font-weight:bold;">TRACK:</span> {session.get('type', 'N/A')}</div>
         </div>""", unsafe_allow_html=True)
 
-        with st.expander(f"📂 OPEN DOSSIER: {session.get('student')}"):
+        dossier_box = st.expander(f"📂 OPEN DOSSIER: {session.get('student')}", key=f"dossier_{i}", on_change="rerun")
+        if not dossier_box.open: continue
+        with dossier_box:
+            session = utils.get_client(session['id'])
+            if session is None: st.caption("Client no longer exists."); continue
             c1, c2 = st.columns([2, 1])
             with c1:
                 st.markdown("#### 📜 HISTORY LOG")
-                history_raw = session.get('history') or ""
-                history_items = [h for h in history_raw.split('|') if h.strip()]
-                if history_items:
-                    for idx, item in enumerate(history_items):
+                # Newest first, paged from session_events instead of splitting the whole blob
+                page_key = f"hist_pages_{session['id']}"
+                shown = HISTORY_PAGE_SIZE * st.session_state.get(page_key, 1)
+                events = utils.get_session_events(session['id'], limit=shown)
+                if events:
+                    for event in events:
+                        item = utils.format_session_event(event)
                         preview = item[:60].replace("\n", " ") + "..." if len(item) > 60 else item
                         # SCROLLABLE POPOVER
                         with st.popover(f"📝 {preview}", use_container_width=True):
                             st.markdown("**FULL SESSION LOG:**")
-                            st.text_area("Full Content", value=item.strip(), height=400, disabled=True, key=f"hist_{i}_{idx}")
+                            full_log = "\n\n".join(part for part in [item, f"NOTES: {event['notes']}" if event['notes'] and event['event_type'] != 'Legacy Log' else "", f"AI CONTEXT:\n{event['ai_context']}" if event['ai_context'] else ""] if part)
+                            st.text_area("Full Content", value=full_log, height=400, disabled=True, key=f"hist_{i}_{event['id']}")
+                    if utils.count_session_events(session['id']) > shown:
+                        if st.button("⬇️ OLDER ENTRIES", key=f"hist_more_{i}"):
+                            st.session_state[page_key] = st.session_state.get(page_key, 1) + 1
+                            st.rerun()
                 else: st.caption("No history.")
 
             with c2:
                 if session.get('latest_resume_json'):
-                    is_exp = session.get('is_experienced', 0) == 1
-                    template = "WSO Academy Resume Template - Deal Experience.docx" if is_exp else "WSO Academy Resume Template.docx"
-                    try:
-                        doc = DocxTemplate(template); doc.render(session['latest_resume_json']); bio = io.BytesIO(); doc.save(bio)
-                        st.download_button("📄 DOWNLOAD LATEST DRAFT", bio.getvalue(), f"WSO_Draft_{session.get('student')}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", key=f"dl_btn_{i}", type="primary")
-                    except: st.warning("Template missing.")
+                    template = document_engine.resume_template(session.get('is_experienced', 0) == 1)
+                    if document_engine.template_available(template):
+                        # Rendered only when clicked, and cached by (template, resume JSON) hash
+                        resume_json = session['latest_resume_json']
+                        st.download_button("📄 DOWNLOAD LATEST DRAFT", lambda: document_engine.render_docx(template, resume_json), f"WSO_Draft_{session.get('student')}.docx", document_engine.DOCX_MIME, key=f"dl_btn_{i}", type="primary")
+                    else: st.warning("Template missing.")
                 else: st.info("No final draft.")
 
             st.markdown("---")
             ec1, ec2 = st.columns(2)
-            if ec1.button(f"🗑️ DELETE", key=f"del_{i}"): delete_client(session.get('student'))
+            if ec1.button(f"🗑️ DELETE", key=f"del_{i}"): delete_client(session['id'], session.get('student'))
             
             with ec2.popover("✏️ EDIT DETAILS"):
                 with st.form(key=f"edit_form_{i}"):
@@ -244,26 +275,35 @@ with tab1:
                     new_is_exp = st.checkbox("Experienced?", value=bool(session.get('is_experienced')))
                     
                     if st.form_submit_button("SAVE CHANGES"):
-                        update_client_details(session.get('student'), new_name, new_date.strftime("%Y-%m-%d"), new_time.strftime("%H:%M"), new_reminder, new_type, new_str, new_foc, 1 if new_is_exp else 0, session.get('resume_text'))
+                        update_client_details(session['id'], new_name, new_date.strftime("%Y-%m-%d"), new_time.strftime("%H:%M"), new_reminder, new_type, new_str, new_foc, 1 if new_is_exp else 0)
 
 # TAB 2: ANALYTICS
 with tab2:
-    if client_db:
-        df = pd.DataFrame(client_db)
+    if client_count:
+        # Narrow reads of the pre-aggregated store (kept current by triggers), cached until the next write
+        stats = utils.analytics_snapshot()
         c1, c2 = st.columns(2)
         with c1:
             st.markdown("#### BUSINESS MIX")
-            if 'type' in df.columns: st.bar_chart(df['type'].value_counts(), color="#000000")
+            st.bar_chart(stats['type_mix'], color="#000000")
         with c2:
             st.markdown("#### MOCK PERFORMANCE")
-            pts = []
-            for c in client_db:
-                if isinstance(c.get('mock_data'), list):
-                    for m in c['mock_data']: pts.append({"Student": c['student'], "Technical": m['tech'], "Behavioral": m['beh']})
-            if pts:
-                chart = alt.Chart(pd.DataFrame(pts)).mark_circle(size=100).encode(x=alt.X('Technical', scale=alt.Scale(domain=[0, 10])), y=alt.Y('Behavioral', scale=alt.Scale(domain=[0, 10])), color=alt.Color('Student', legend=None), tooltip=['Student', 'Technical', 'Behavioral']).properties(height=300).interactive()
+            # One point per client: latest mock, with the running averages in the tooltip
+            pts = stats['mock_series']
+            if not pts.empty:
+                chart = alt.Chart(pts).mark_circle().encode(x=alt.X('Technical', scale=alt.Scale(domain=[0, 10])), y=alt.Y('Behavioral', scale=alt.Scale(domain=[0, 10])), size=alt.Size('Mocks', legend=None), color=alt.Color('Student', legend=None), tooltip=['Student', 'Technical', 'Behavioral', 'Mocks', 'Tech Avg', 'Beh Avg', 'Last Mock']).properties(height=300).interactive()
                 st.altair_chart(chart, use_container_width=True)
             else: st.info("No mock data.")
+        st.markdown("#### MOCK TRENDS & AT-RISK")
+        trends = stats['trends']
+        if not trends.empty:
+            at_risk = int(trends['At Risk'].sum())
+            if at_risk: st.warning(f"⚠️ {at_risk} CLIENT(S) AT RISK (bottom quartile or sliding)")
+            st.dataframe(trends.drop(columns="client_id"), hide_index=True, use_container_width=True)
+        else: st.info("No mock data.")
+        st.markdown("#### SESSION THROUGHPUT (WEEKLY)")
+        if not stats['throughput'].empty: st.bar_chart(stats['throughput'])
+        else: st.info("No sessions logged yet.")
 
 # TAB 3: MASTER DATABASE
 with tab3:
@@ -274,32 +314,61 @@ with tab3:
             up = st.file_uploader("Select File", type=["pdf", "docx", "txt", "csv"], key="dash_master_up")
             if up and st.button("💾 SAVE TO VAULT"):
                 try:
-                    cnt = ""
-                    if up.name.lower().endswith('.pdf'): reader=PdfReader(up); cnt="\n".join([p.extract_text() for p in reader.pages])
-                    elif up.name.lower().endswith('.docx'): doc=docx.Document(up); cnt="\n".join([p.text for p in doc.paragraphs])
-                    elif up.name.lower().endswith('.txt'): cnt=str(up.read(), "utf-8")
-                    conn=utils.get_db_connection(); cur=conn.cursor()
-                    cur.execute("INSERT INTO global_kb (filename, content) VALUES (?, ?)", (up.name, cnt)); conn.commit()
-                    cur.execute("SELECT * FROM global_kb"); st.session_state['global_kb']=[dict(row) for row in cur.fetchall()]
+                    cnt = ingest_engine.read_upload(up)['text']
+                    def save_doc(conn):
+                        doc_id = conn.execute("INSERT INTO global_kb (filename, content) VALUES (?, ?)", (up.name, cnt)).lastrowid
+                        vault_engine.index_document(conn, 'global', doc_id, up.name, cnt)
+                    utils.run_write(save_doc)
+                    utils.refresh_global_kb()
                     st.success(f"Uploaded: {up.name}"); st.rerun()
                 except Exception as e: st.error(str(e))
+
+        vq1, vq2 = st.columns([3, 1])
+        vault_query = vq1.text_input("🔎 SEARCH VAULT", placeholder="e.g., terminal value growth rate")
+        semantic = vq2.toggle("🧠 SYNONYMS", help="Vector search: matches 'DCF' to 'discounted cash flow', 'LBO' to 'leveraged buyout'.")
+        if vault_query:
+            search_fn = vector_engine.semantic_search if semantic else vault_engine.search
+            hits = search_fn(utils.get_db_connection(), vault_query, k=8, source='global')
+            if not hits: st.caption("No matching passages.")
+            for h_idx, hit in enumerate(hits):
+                with st.popover(f"📌 {hit['filename']} ({hit['score']:.2f})", use_container_width=True):
+                    st.text_area("Passage", value=hit['chunk'], height=250, disabled=True, key=f"vs_{h_idx}")
         
         gkb = st.session_state.get('global_kb', [])
         if gkb:
             for d in gkb:
                 with st.expander(f"📄 {d['filename']}"):
                     # Added unique keys to prevent duplicate ID error
-                    st.text_area("Preview", value=d['content'][:1000]+"...", height=150, disabled=True, key=f"p_{d['id']}")
+                    st.text_area("Preview", value=(d['preview'] or "")+"...", height=150, disabled=True, key=f"p_{d['id']}")
                     if st.button(f"🗑️ DELETE", key=f"pg_{d['id']}"):
-                        conn=utils.get_db_connection(); cur=conn.cursor()
-                        cur.execute("DELETE FROM global_kb WHERE id=?", (d['id'],)); conn.commit()
-                        cur.execute("SELECT * FROM global_kb"); st.session_state['global_kb']=[dict(row) for row in cur.fetchall()]; st.rerun()
+                        def delete_doc(conn):
+                            conn.execute("DELETE FROM global_kb WHERE id=?", (d['id'],))
+                            vault_engine.remove_document(conn, 'global', d['id'])
+                        utils.run_write(delete_doc)
+                        utils.refresh_global_kb(); st.rerun()
         else: st.warning("Vault Empty.")
 
     with cdb:
         st.markdown("### 🗄️ CLIENT LOGS")
-        if client_db:
-            df=pd.DataFrame(client_db)
+        if client_count:
+            log_pages = max(1, -(-client_count // CLIENT_LOG_PAGE_SIZE))
+            log_page = st.number_input(f"PAGE (OF {log_pages})", min_value=1, max_value=log_pages, value=1, key="client_log_page")
+            df = pd.DataFrame(utils.list_clients(limit=CLIENT_LOG_PAGE_SIZE, offset=(log_page - 1) * CLIENT_LOG_PAGE_SIZE))
             st.dataframe(df, use_container_width=True, height=500)
-            st.download_button("💾 EXPORT CSV", df.to_csv(index=False).encode('utf-8'), "WSO_Backup.csv", "text/csv", type="primary", use_container_width=True)
+            with st.expander("💾 EXPORT / BACKUP"):
+                conn = utils.get_db_connection()
+                export_table = st.selectbox("TABLE", export_engine.EXPORT_TABLES + [export_engine.ALL_TABLES], key="export_table")
+                export_fmt = st.selectbox("FORMAT", list(export_engine.EXPORT_FORMATS), key="export_fmt")
+                fmt_info = export_engine.EXPORT_FORMATS[export_fmt]
+                # Deferred: rows are streamed from SQLite in chunks only when the button is clicked
+                if export_table == export_engine.ALL_TABLES:
+                    st.caption(f"One {fmt_info['ext']} file per table: {', '.join(export_engine.EXPORT_TABLES)} (all columns except the legacy history / mock blobs).")
+                    st.download_button("💾 EXPORT", lambda: export_engine.build_backup(utils.DB_PATH, export_fmt),
+                                       "WSO_Backup.zip", "application/zip", type="primary", use_container_width=True)
+                else:
+                    all_cols = [name for name, _ in export_engine.exportable_columns(conn, export_table)]
+                    export_cols = st.multiselect("COLUMNS", all_cols, default=export_engine.default_columns(conn, export_table),
+                                                 format_func=export_engine.column_label, key=f"export_cols_{export_table}")
+                    st.download_button("💾 EXPORT", lambda: export_engine.build_export(utils.DB_PATH, export_cols, export_fmt, export_table),
+                                       f"WSO_Backup_{export_table}.{fmt_info['ext']}", fmt_info['mime'], type="primary", use_container_width=True, disabled=not export_cols)
         else: st.info("No clients.")
\ No newline at end of file
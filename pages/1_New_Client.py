@@ -2,9 +2,9 @@ import streamlit as st
 import utils
 import datetime
 import pandas as pd
-import json
-from pypdf import PdfReader
-import docx
+import time
+import ingest_engine
+import import_engine
 
 st.set_page_config(page_title="New Client | WSO OS", layout="wide")
 utils.load_css()
@@ -12,6 +12,9 @@ utils.init_db()
 
 st.title("CLIENT INTAKE PROTOCOL")
 
+# Seconds between bulk-import progress redraws
+IMPORT_PROGRESS_INTERVAL = 0.2
+
 # --- TABBED INTERFACE ---
 tab1, tab2 = st.tabs(["👤 INDIVIDUAL INTAKE", "📦 BULK CSV IMPORT"])
 
@@ -66,40 +69,15 @@ with tab1:
         with rc2:
             cv_file = st.file_uploader("UPLOAD CV (PDF/DOCX) - AUTO-PARSE", type=["pdf", "docx"])
             
-        # --- ROBUST & DEDUPLICATED TEXT EXTRACTOR ---
+        # --- SHARED INGESTION (cached by content hash, so reruns don't re-parse) ---
         extracted_text = ""
         if cv_file:
             try:
-                # 1. Handle PDF
-                if cv_file.name.lower().endswith('.pdf'):
-                    reader = PdfReader(cv_file)
-                    for page in reader.pages:
-                        extracted_text += page.extract_text() or ""
-                
-                # 2. Handle DOCX (with Merged Cell Deduplication)
-                elif cv_file.name.lower().endswith('.docx'):
-                    doc = docx.Document(cv_file)
-                    full_text = []
-                    
-                    # A. Grab Standard Paragraphs
-                    for para in doc.paragraphs:
-                        full_text.append(para.text)
-                    
-                    # B. Grab Text from Tables (Handling Merged Cells)
-                    for table in doc.tables:
-                        for row in table.rows:
-                            # Unique set to track cells we've already read in this row
-                            seen_cells = set()
-                            for cell in row.cells:
-                                if cell not in seen_cells:
-                                    seen_cells.add(cell)
-                                    for para in cell.paragraphs:
-                                        full_text.append(para.text)
-                                    
-                    extracted_text = "\n".join(full_text)
+                parsed = ingest_engine.read_upload(cv_file)
+                extracted_text = parsed['text']
                 
                 if len(extracted_text) > 50:
-                    st.success(f"✅ CV Parsed Successfully ({len(extracted_text)} chars). Ready to sync.")
+                    st.success(f"✅ CV Parsed Successfully ({len(extracted_text)} chars, {parsed['pages']} page(s), {parsed['seconds']:.2f}s). Ready to sync.")
                 else:
                     st.warning("⚠️ File uploaded, but very little text found. Is it an image scan?")
                     
@@ -135,22 +113,11 @@ with tab1:
                 
             str_val = strengths if strengths else "Pending Assessment"
             foc_val = weaknesses if weaknesses else "Pending Assessment"
-            hist_val = "New Client Onboarding Completed."
             exp_int = 1 if is_exp else 0 
             
-            conn = utils.get_db_connection()
-            cursor = conn.cursor()
-            
-            # UPDATED INSERT: Added session_date and reminder_freq
-            cursor.execute('''
-                INSERT INTO clients (student, session_date, time, reminder_freq, type, strengths, focus, history, resume_text, is_experienced)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (upper_name, date_str, time_str, reminder, session_type, str_val, foc_val, hist_val, extracted_text, exp_int))
-            conn.commit()
-
-            # Refresh Session State from DB to ensure new columns are picked up
-            cursor.execute("SELECT * FROM clients")
-            st.session_state['client_db'] = [dict(row) for row in cursor.fetchall()]
+            new_id = utils.insert_client(student=upper_name, session_date=date_str, time=time_str, reminder_freq=reminder, type=session_type,
+                                         strengths=str_val, focus=foc_val, resume_text=extracted_text, is_experienced=exp_int)
+            utils.log_session_event(new_id, "Onboarding", notes="New Client Onboarding Completed.")
             
             st.success(f"DOSSIER GENERATED: {upper_name} scheduled for {date_str} @ {time_str}")
             st.toast(f"Intake Complete: {upper_name}")
@@ -164,6 +131,7 @@ with tab2:
     st.info("PROTOCOL: UPLOAD A CSV WITH THE HEADERS BELOW TO IMPORT MULTIPLE CLIENTS AT ONCE.")
     st.markdown("#### 1. REQUIRED CSV FORMAT")
     st.caption("Headers: Student Name, Session Type, Strengths, Weaknesses, History, Mock Score (Tech), Mock Score (Beh)")
+    st.caption("Optional: Client ID. Re-importing updates clients with a matching Client ID instead of duplicating them; rows without one are always added as new clients.")
     
     bulk_file = st.file_uploader("Upload Client List (CSV)", type=["csv"])
     
@@ -174,54 +142,25 @@ with tab2:
             st.dataframe(df.head(), use_container_width=True)
             
             if st.button("🚀 EXECUTE BULK IMPORT", type="primary", use_container_width=True):
-                success_count = 0
-                conn = utils.get_db_connection()
-                cursor = conn.cursor()
-                progress_bar = st.progress(0)
-                total_rows = len(df)
-                
-                # Bulk import generally doesn't set specific future dates, defaulting to today or None if needed
+                # Bulk import generally doesn't set specific future dates, defaulting to today
                 today_str = datetime.date.today().strftime("%Y-%m-%d")
+                frame = import_engine.normalize_import(df, today_str)
+                total_rows = len(frame)
+                merged_rows = len(df) - total_rows
+                progress_bar = st.progress(0, text=f"STAGING {total_rows} CLIENTS...")
+
+                # One write job (one transaction); the page polls its progress a few times a second
+                staged = {"done": 0}
+                future = utils.submit_write(lambda conn: import_engine.upsert_clients(conn, frame, progress=lambda done, total: staged.update(done=done)))
+                while not future.done():
+                    progress_bar.progress(staged["done"] / max(total_rows, 1), text=f"STAGED {staged['done']}/{total_rows}")
+                    time.sleep(IMPORT_PROGRESS_INTERVAL)
+                counts = future.result()
+                progress_bar.progress(1.0, text="DONE")
+                success_count = counts["inserted"] + counts["updated"]
+                st.caption(f"{counts['inserted']} NEW, {counts['updated']} UPDATED (MATCHED ON {import_engine.IMPORT_ID_COLUMN.upper()}), {total_rows - success_count} UNCHANGED")
+                if merged_rows: st.warning(f"{merged_rows} ROW(S) REPEATED A {import_engine.IMPORT_ID_COLUMN.upper()} FROM LATER IN THE FILE AND WERE MERGED INTO IT.")
 
-                for index, row in df.iterrows():
-                    name = str(row.get("Student Name", "Unknown")).strip().upper()
-                    sType = str(row.get("Session Type", "General"))
-                    strs = str(row.get("Strengths", "Imported"))
-                    wks = str(row.get("Weaknesses", "Imported"))
-                    hist = str(row.get("History", "Imported via CSV."))
-                    default_time = "Async" if "Resume" in sType else "09:00"
-
-                    mock_json = "[]"
-                    try:
-                        t_score = float(row.get("Mock Score (Tech)", 0))
-                        b_score = float(row.get("Mock Score (Beh)", 0))
-                        if t_score > 0 or b_score > 0:
-                            mock_entry = [{
-                                "date": today_str,
-                                "tech": t_score,
-                                "beh": b_score,
-                                "notes": "Imported Historical Data"
-                            }]
-                            mock_json = json.dumps(mock_entry)
-                    except:
-                        mock_json = "[]"
-
-                    try:
-                        cursor.execute('''
-                            INSERT INTO clients (student, session_date, time, type, strengths, focus, history, mock_data, resume_text, is_experienced)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (name, today_str, default_time, sType, strs, wks, hist, mock_json, "", 0))
-                        success_count += 1
-                    except Exception as e:
-                        st.warning(f"Skipped row {index}: {e}")
-                    
-                    progress_bar.progress((index + 1) / total_rows)
-
-                conn.commit()
-                cursor.execute("SELECT * FROM clients")
-                rows = cursor.fetchall()
-                st.session_state['client_db'] = [dict(row) for row in rows]
-                
                 st.success(f"✅ SUCCESS: {success_count} CLIENTS IMPORTED.")
                 st.balloons()
                 
@@ -4,8 +4,8 @@ import datetime
 import json
 import io
 import csv
-from pypdf import PdfReader
-import docx
+import ingest_engine
+import vault_engine
 
 st.set_page_config(page_title="Session Prep | WSO OS", layout="wide")
 utils.load_css()
@@ -13,6 +13,10 @@ utils.init_db()
 
 st.title("SESSION EXECUTION")
 
+# Token budgets for Master Vault / client dossier context in the Mock Interview planner
+MASTER_CONTEXT_TOKEN_BUDGET = 4000
+DOSSIER_CONTEXT_TOKEN_BUDGET = 1250
+
 # =========================================================
 # LAYER 0: GLOBAL MASTER BANK (SIDEBAR)
 # =========================================================
@@ -22,32 +26,15 @@ with st.sidebar:
     
     master_upload = st.file_uploader("Add to Master Bank", type=["pdf", "docx", "txt", "csv"], key="master_up")
     if master_upload:
-        m_content = ""
         try:
-            if master_upload.name.lower().endswith('.pdf'):
-                reader = PdfReader(master_upload)
-                m_content = "\n".join([p.extract_text() for p in reader.pages])
-            elif master_upload.name.lower().endswith('.docx'):
-                doc = docx.Document(master_upload)
-                full_text = [p.text for p in doc.paragraphs]
-                for table in doc.tables:
-                    for row in table.rows:
-                        seen = set()
-                        for cell in row.cells:
-                            if cell not in seen:
-                                seen.add(cell)
-                                full_text.extend([p.text for p in cell.paragraphs])
-                m_content = "\n".join(full_text)
-            elif master_upload.name.lower().endswith('.csv'):
-                m_content = master_upload.getvalue().decode("utf-8")
-            elif master_upload.name.lower().endswith('.txt'):
-                m_content = str(master_upload.read(), "utf-8")
+            m_content = ingest_engine.read_upload(master_upload)['text']
 
             if st.button("💾 SAVE TO MASTER VAULT"):
-                conn = utils.get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO global_kb (filename, content) VALUES (?, ?)", (master_upload.name, m_content))
-                conn.commit()
+                def save_master(conn):
+                    doc_id = conn.execute("INSERT INTO global_kb (filename, content) VALUES (?, ?)", (master_upload.name, m_content)).lastrowid
+                    vault_engine.index_document(conn, 'global', doc_id, master_upload.name, m_content)
+                utils.run_write(save_master)
+                utils.refresh_global_kb()
                 st.success(f"Archived: {master_upload.name}")
                 st.rerun()
         except Exception as e:
@@ -60,26 +47,31 @@ with st.sidebar:
             st.caption(f"• {doc['filename']}")
         
         if st.button("🗑️ WIPE MASTER VAULT", type="secondary"):
-            conn = utils.get_db_connection()
-            conn.cursor().execute("DELETE FROM global_kb")
-            conn.commit()
+            def wipe_master(conn):
+                conn.execute("DELETE FROM global_kb")
+                vault_engine.clear_source(conn, 'global')
+            utils.run_write(wipe_master)
+            utils.refresh_global_kb()
             st.rerun()
 
 # =========================================================
 # MAIN INTERFACE: SELECTION & CONTEXT
 # =========================================================
-client_names = [c['student'] for c in st.session_state['client_db']]
-client_list = ["Guest / Walk-in"] + client_names
+# Select by id (names are not unique); None is the walk-in guest
+choices = utils.client_choices()
 
 col_sel1, col_sel2 = st.columns([1, 2])
 with col_sel1:
-    selected_client = st.selectbox("SELECT CANDIDATE", client_list)
+    client_id = st.selectbox("SELECT CANDIDATE", [None] + list(choices), format_func=lambda cid: "Guest / Walk-in" if cid is None else choices[cid])
 
 client_kb_text = ""
-if selected_client != "Guest / Walk-in":
-    client_data = next((c for c in st.session_state['client_db'] if c['student'] == selected_client), None)
-    if client_data:
-        client_kb_text = client_data.get('session_kb_text') or ""
+client_data = utils.get_client(client_id)
+if client_data is None:
+    client_id = None
+    selected_client = "Guest / Walk-in"
+else:
+    selected_client = client_data['student']
+    client_kb_text = client_data.get('session_kb_text') or ""
 
 with col_sel2:
     session_type = st.selectbox("SELECT SESSION TYPE", [
@@ -99,22 +91,26 @@ if session_type == "Mock Interview":
         client_files = st.file_uploader("Upload to Client Dossier", type=["pdf", "docx", "txt"], accept_multiple_files=True)
         
         if client_files:
-            new_client_text = ""
-            for cf in client_files:
-                if cf.name.lower().endswith('.pdf'):
-                    reader = PdfReader(cf)
-                    new_client_text += "\n".join([p.extract_text() for p in reader.pages])
-                elif cf.name.lower().endswith('.docx'):
-                    doc = docx.Document(cf)
-                    new_client_text += "\n".join([p.text for p in doc.paragraphs])
+            # Parsed in parallel across a process pool; cached files are instant on reruns
+            parse_bar = st.progress(0.0, text="Parsing uploads...")
+            parsed_files = ingest_engine.extract_many(
+                [(cf.name, cf.getvalue()) for cf in client_files],
+                progress=lambda done, total, r: parse_bar.progress(done / total, text=f"Parsed {r['filename']} ({done}/{total})")
+            )
+            for pf in parsed_files:
+                if pf.get('error'): st.warning(f"Skipped {pf['filename']}: {pf['error']}")
+            new_client_text = "\n".join(pf['text'] for pf in parsed_files if pf['text'])
             
             if st.button("💾 SAVE TO CLIENT DOSSIER"):
-                updated_kb = (client_kb_text + "\n" + new_client_text).strip()
-                conn = utils.get_db_connection()
-                conn.cursor().execute("UPDATE clients SET session_kb_text = ? WHERE student = ?", (updated_kb, selected_client))
-                conn.commit()
-                st.success("Dossier Updated.")
-                st.rerun()
+                if client_id is None: st.error("Cannot save guest.")
+                else:
+                    updated_kb = (client_kb_text + "\n" + new_client_text).strip()
+                    def save_overlay(conn):
+                        utils.update_client(client_id, conn=conn, session_kb_text=updated_kb)
+                        vault_engine.index_document(conn, 'client', client_id, selected_client, updated_kb)
+                    utils.run_write(save_overlay)
+                    st.success("Dossier Updated.")
+                    st.rerun()
 
     # --- THE UNIFIED INTERVIEW ENGINE ---
     with st.container(border=True):
@@ -127,19 +123,26 @@ if session_type == "Mock Interview":
             beh_topics = st.multiselect("BEHAVIORAL FOCUS", ["TMAY", "Why IB/PE?", "Conflict/Teamwork", "Strengths/Weaknesses", "Market View"])
         
         use_manual = st.toggle("⚡ ENABLE AI PROMPT OVERRIDE")
+        force_fresh = st.toggle("♻️ FORCE FRESH PLAN (BYPASS AI CACHE)")
         if use_manual:
             custom_prompt = st.text_area("ENTER CUSTOM AI INSTRUCTIONS", placeholder="e.g., Focus on the deal experience mentioned in their CV...")
         
         if st.button("🚀 GENERATE INTEGRATED SESSION PLAN", use_container_width=True):
             with st.spinner("Analyzing Master Vault and Dossier..."):
                 try:
-                    engine = utils.AIEngine()
-                    master_context = "\n\n".join([d['content'] for d in st.session_state.get('global_kb', [])])
+                    # Budgeted retrieval: only the vault chunks most relevant to the chosen topics + dossier
+                    query_weights = vault_engine.build_query_terms(tech_topics + beh_topics, client_kb_text, custom_prompt if use_manual else "")
+                    conn = utils.get_db_connection()
+                    master_context, ctx_stats = vault_engine.assemble_context(conn, query_weights, token_budget=MASTER_CONTEXT_TOKEN_BUDGET)
+                    dossier_context = ""
+                    if client_id is not None:
+                        dossier_context, _ = vault_engine.assemble_context(conn, query_weights, token_budget=DOSSIER_CONTEXT_TOKEN_BUDGET, source='client', doc_id=client_id)
+                    st.caption(f"VAULT CONTEXT: {ctx_stats['chunks_used']}/{ctx_stats['chunks_total']} chunks, ~{ctx_stats['tokens_used']} tokens")
                     
                     system_instruction = f"""
                     You are a strict Wall Street Managing Director. 
-                    MASTER KNOWLEDGE BASE: {master_context[:20000]}
-                    CLIENT-SPECIFIC DOSSIER: {client_kb_text[:5000]}
+                    MASTER KNOWLEDGE BASE: {master_context}
+                    CLIENT-SPECIFIC DOSSIER: {dossier_context}
                     """
                     
                     if use_manual:
@@ -155,16 +158,20 @@ if session_type == "Mock Interview":
                         Format: Markdown with Bold headers.
                         """
                     
-                    response = engine.generate_content(final_prompt)
-                    # STORE IN SESSION STATE IMMEDIATELY
-                    st.session_state[f"last_agenda_{selected_client}"] = response.text
+                    # The AI call runs on the job queue; the panel below picks the agenda up when it's done
+                    utils.start_job(f"agenda_job_{client_id}", "agenda", {"prompt": final_prompt, "fresh": force_fresh},
+                                    key=utils.job_key("agenda", selected_client, final_prompt), reuse_done=not force_fresh)
                 except Exception as e:
                     st.error(f"AI Error: {e}")
 
+        def store_agenda(text):
+            st.session_state[f"last_agenda_{client_id}"] = text
+        utils.job_panel(f"agenda_job_{client_id}", store_agenda, "GENERATING SESSION PLAN...")
+
         # DISPLAY PERSISTENTLY
-        if f"last_agenda_{selected_client}" in st.session_state:
+        if f"last_agenda_{client_id}" in st.session_state:
              st.markdown("### 📋 INTEGRATED SESSION PLAN")
-             st.info(st.session_state[f"last_agenda_{selected_client}"])
+             st.info(st.session_state[f"last_agenda_{client_id}"])
 
     # --- SCORING & LOGGING ---
     st.markdown("---")
@@ -177,69 +184,47 @@ if session_type == "Mock Interview":
     
     with c_save:
         if st.button("💾 SAVE SESSION & LOG QUESTIONS", use_container_width=True):
-            if selected_client == "Guest / Walk-in":
+            if client_id is None:
                 st.error("Cannot save guest.")
             else:
                 # FIX: Explicitly grab full text from session state to avoid truncation
-                agenda = st.session_state.get(f"last_agenda_{selected_client}", "No AI Agenda generated.")
-                timestamp = datetime.date.today().strftime("%m/%d")
-                
-                # Formatting the log entry to include everything
-                full_log = f"""
-                SESSION: Mock Interview ({tech_score} T, {beh_score} B)
-                FEEDBACK: {live_notes}
-                AI AGENDA / QUESTIONS ASKED:
-                {agenda}
-                """
-                
-                # Use a separator for the history column
-                history_update = f" | {timestamp}: {full_log}"
-                
-                new_mock = {"date": timestamp, "tech": tech_score, "beh": beh_score, "notes": live_notes}
-
-                conn = utils.get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT history, mock_data FROM clients WHERE student = ?", (selected_client,))
-                row = cursor.fetchone()
-                
-                if row:
-                    m_data = json.loads(row['mock_data']) if row['mock_data'] else []
-                    m_data.append(new_mock)
-                    cursor.execute("UPDATE clients SET history = ?, mock_data = ? WHERE student = ?", 
-                                   ((row['history'] or "") + history_update, json.dumps(m_data), selected_client))
-                    conn.commit()
-                    # Sync State
-                    for c in st.session_state['client_db']:
-                        if c['student'] == selected_client:
-                            c['history'] = (row['history'] or "") + history_update
-                            c['mock_data'] = m_data
-                            break
+                agenda = st.session_state.get(f"last_agenda_{client_id}", "No AI Agenda generated.")
+
+                # Mock row + history event in one writer job; both are plain appends
+                def save_mock(conn):
+                    if conn.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is None: return False
+                    utils.add_mock_score(client_id, tech_score, beh_score, notes=live_notes, conn=conn)
+                    # History is append-only: one event row with the full agenda as AI context
+                    utils.log_session_event(client_id, "Mock Interview", notes=live_notes, scores={"tech": tech_score, "beh": beh_score}, ai_context=agenda, conn=conn)
+                    return True
+
+                if utils.run_write(save_mock):
                     st.success("✅ FULL SESSION SAVED. Context stored for future reference.")
     
     with c_pdf:
         # --- NEW: PDF REPORT CARD GENERATOR ---
         if st.button("📄 GENERATE REPORT CARD (PDF)", use_container_width=True):
-            if selected_client == "Guest / Walk-in":
+            if client_id is None:
                 st.error("Please select a valid client from DB.")
             else:
-                try:
-                    pdf_buffer = utils.create_pdf_report(
-                        student=selected_client,
-                        tech_score=tech_score,
-                        beh_score=beh_score,
-                        feedback=live_notes,
-                        agenda=st.session_state.get(f"last_agenda_{selected_client}", "")
-                    )
-                    
-                    st.download_button(
-                        label="⬇️ DOWNLOAD PDF SCORECARD",
-                        data=pdf_buffer,
-                        file_name=f"WSO_Report_{selected_client}.pdf",
-                        mime="application/pdf",
-                        type="primary"
-                    )
-                except Exception as e:
-                    st.error(f"Error generating PDF: {e}")
+                # Rendering runs in a worker process; the download appears once the PDF is ready
+                card = {"student": selected_client, "tech_score": tech_score, "beh_score": beh_score, "feedback": live_notes,
+                        "agenda": st.session_state.get(f"last_agenda_{client_id}", ""),
+                        "history": [(m['tech'], m['beh']) for m in utils.get_mock_scores(client_id)]}
+                st.session_state.pop(f"report_pdf_{client_id}", None)
+                utils.start_job(f"report_job_{client_id}", "report_card", card, key=utils.job_key("report_card", card, datetime.date.today()))
+
+        def store_report(pdf):
+            st.session_state[f"report_pdf_{client_id}"] = pdf
+        utils.job_panel(f"report_job_{client_id}", store_report, "RENDERING REPORT CARD...")
+        if st.session_state.get(f"report_pdf_{client_id}"):
+            st.download_button(
+                label="⬇️ DOWNLOAD PDF SCORECARD",
+                data=st.session_state[f"report_pdf_{client_id}"],
+                file_name=f"WSO_Report_{selected_client}.pdf",
+                mime="application/pdf",
+                type="primary"
+            )
 
 # =========================================================
 # OTHER SESSION TYPES (Standard Logic)
@@ -248,12 +233,16 @@ elif session_type == "7 Stories Review":
     st.header(f"7 STORIES REVIEW: {selected_client}")
     st.info("PROTOCOL: 60 MIN SESSION. ENSURE STAR FRAMEWORK ADHERENCE.")
     
+    STAR_AUDIT_PROMPT = """
+                            Analyze these notes against the STAR framework.
+                            Return valid JSON with keys: "Situation", "Task", "Action", "Result" (values: "[Found/Missing] - Brief reason"), and "Verdict" ("Pass"/"Needs Polish").
+                            """
     story_prompts = ["1. Strengths", "2. Weaknesses", "3. Hard Worker", "4. Team Player", "5. Conflict (Peer)", "6. Conflict (Superior)", "7. Ethical"]
     current_stories = {}
     progress_bar = st.progress(0)
     
     for i, story in enumerate(story_prompts):
-        clean_key = f"{selected_client}_{story.replace(' ', '_')}"
+        clean_key = f"{client_id}_{story.replace(' ', '_')}"
         with st.expander(story.upper(), expanded=False):
             c1, c2 = st.columns([3, 1])
             note = c1.text_area("STORY NOTES (S.T.A.R.)", height=150, key=f"note_{clean_key}", placeholder="Situation... Task... Action... Result...")
@@ -266,12 +255,8 @@ elif session_type == "7 Stories Review":
                 else:
                     with st.spinner("Scanning..."):
                         try:
-                            model = utils.AIEngine()
-                            system_prompt = """
-                            Analyze these notes against the STAR framework.
-                            Return valid JSON with keys: "Situation", "Task", "Action", "Result" (values: "[Found/Missing] - Brief reason"), and "Verdict" ("Pass"/"Needs Polish").
-                            """
-                            response = model.generate_content(f"{system_prompt}\n\nNOTES:\n{note}", config={"response_mime_type": "application/json"})
+                            model = utils.get_ai_engine()
+                            response = model.generate_content(f"{STAR_AUDIT_PROMPT}\n\nNOTES:\n{note}", config={"response_mime_type": "application/json"})
                             audit_data = json.loads(response.text)
                             v_color = "green" if audit_data.get("Verdict") == "Pass" else "red"
                             st.markdown(f"**VERDICT:** :{v_color}[{audit_data.get('Verdict')}]")
@@ -283,30 +268,37 @@ elif session_type == "7 Stories Review":
     verified_count = sum(1 for s in current_stories.values() if s['star_verified'])
     progress_bar.progress(verified_count / 7.0)
     st.caption(f"**{verified_count} / 7 Stories Verified**")
+
+    # --- BATCH AUDIT: all stories in parallel (≈ the time of one call) ---
+    if st.button("🤖 AUDIT ALL 7 STORIES", use_container_width=True):
+        auditable = [s for s in story_prompts if len(current_stories[s]['notes'] or "") >= 10]
+        if not auditable: st.error("Need more notes.")
+        else:
+            with st.spinner(f"Scanning {len(auditable)} stories in parallel..."):
+                model = utils.get_ai_engine()
+                prompts = [f"{STAR_AUDIT_PROMPT}\n\nNOTES:\n{current_stories[s]['notes']}" for s in auditable]
+                responses = model.generate_many(prompts, config={"response_mime_type": "application/json"}, concurrency=7)
+                batch_audit = {}
+                for story, resp in zip(auditable, responses):
+                    try: batch_audit[story] = json.loads(resp.text) if not isinstance(resp, Exception) else {"Verdict": "ERROR", "Error": str(resp)}
+                    except Exception as e: batch_audit[story] = {"Verdict": "ERROR", "Error": str(e)}
+                st.session_state[f"star_batch_{client_id}"] = batch_audit
+
+    if st.session_state.get(f"star_batch_{client_id}"):
+        st.markdown("#### 🧾 BATCH STAR AUDIT")
+        for story, audit_data in st.session_state[f"star_batch_{client_id}"].items():
+            v_color = "green" if audit_data.get("Verdict") == "Pass" else "red"
+            with st.expander(f"{story.upper()} — {audit_data.get('Verdict')}"):
+                st.markdown(f"**VERDICT:** :{v_color}[{audit_data.get('Verdict')}]")
+                st.json(audit_data)
     st.markdown("---")
     
     if st.button("SAVE STORY PROTOCOL"):
-        if selected_client == "Guest / Walk-in": st.warning("Cannot save guest.")
+        if client_id is None: st.warning("Cannot save guest.")
         else:
-            timestamp = datetime.date.today().strftime("%m/%d")
-            history_entry = f" | {timestamp}: 7 Stories Review ({verified_count}/7 STAR verified)"
-            stories_json = json.dumps(current_stories)
-            conn = utils.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT history FROM clients WHERE student = ?", (selected_client,))
-            row = cursor.fetchone()
-            if row:
-                new_history = row['history'] or ""
-                if history_entry not in new_history: new_history += history_entry
-                cursor.execute("UPDATE clients SET history = ?, stories_log = ? WHERE student = ?", (new_history, stories_json, selected_client))
-                conn.commit()
-                for client in st.session_state['client_db']:
-                    if client['student'] == selected_client:
-                        client['stories_log'] = current_stories
-                        client['history'] = new_history
-                        break
-                st.success(f"SAVED TO DATABASE: {selected_client}")
-            else: st.error("Client not found.")
+            utils.update_client(client_id, stories_log=current_stories)
+            utils.log_session_event(client_id, "7 Stories Review", scores={"star_verified": verified_count, "out_of": 7})
+            st.success(f"SAVED TO DATABASE: {selected_client}")
 
 elif session_type == "LinkedIn Audit":
     import datetime
@@ -332,24 +324,11 @@ elif session_type == "LinkedIn Audit":
         url_check = st.checkbox("4. CUSTOM URL SET")
         
     if st.button("SAVE LINKEDIN PROTOCOL"):
-        if selected_client == "Guest / Walk-in": st.error("Cannot save guest.")
+        if client_id is None: st.error("Cannot save guest.")
         else:
-            timestamp = datetime.date.today().strftime("%m/%d")
             score = sum([photo_check, headline_check, about_check, url_check])
-            history_entry = f" | {timestamp}: LinkedIn Audit ({score}/4 Rules Passed)"
-            conn = utils.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT history FROM clients WHERE student = ?", (selected_client,))
-            row = cursor.fetchone()
-            if row:
-                new_history = (row['history'] or "") + history_entry
-                cursor.execute("UPDATE clients SET history = ? WHERE student = ?", (new_history, selected_client))
-                conn.commit()
-                for client in st.session_state['client_db']:
-                    if client['student'] == selected_client:
-                        client['history'] = new_history
-                        break
-                st.success(f"SAVED: {selected_client} scored {score}/4")
+            utils.log_session_event(client_id, "LinkedIn Audit", scores={"rules_passed": score, "out_of": 4})
+            st.success(f"SAVED: {selected_client} scored {score}/4")
 
 elif session_type == "Career Roadmap":
     import datetime
@@ -362,8 +341,7 @@ elif session_type == "Career Roadmap":
         cv_text = ""
         if road_cv:
             try:
-                reader = PdfReader(road_cv)
-                for page in reader.pages: cv_text += page.extract_text() or ""
+                cv_text = ingest_engine.read_upload(road_cv)['text']
                 st.success("✅ CV Parsed.")
             except: st.error("Error reading CV.")
     with c2:
@@ -387,7 +365,7 @@ elif session_type == "Career Roadmap":
         else:
             with st.spinner("Synthesizing..."):
                 try:
-                    model = utils.AIEngine()
+                    model = utils.get_ai_engine()
                     hurdles = []
                     if chk_visa: hurdles.append("Visa Sponsorship")
                     if chk_timeline: hurdles.append("Off-cycle")
@@ -404,29 +382,15 @@ elif session_type == "Career Roadmap":
                     response = model.generate_content(system_prompt)
                     st.markdown("#### 🎯 STRATEGY SUMMARY")
                     st.info(response.text)
-                    st.session_state[f'roadmap_summary_{selected_client}'] = response.text
+                    st.session_state[f'roadmap_summary_{client_id}'] = response.text
                 except Exception as e: st.error(f"AI Error: {e}")
 
     if st.button("SAVE ROADMAP TO DOSSIER"):
-        if selected_client == "Guest / Walk-in": st.error("Cannot save guest.")
+        if client_id is None: st.error("Cannot save guest.")
         else:
-            timestamp = datetime.date.today().strftime("%m/%d")
-            history_entry = f" | {timestamp}: Career Roadmap Completed."
-            conn = utils.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT history FROM clients WHERE student = ?", (selected_client,))
-            row = cursor.fetchone()
-            if row:
-                new_history = (row['history'] or "") + history_entry
-                summary_key = f'roadmap_summary_{selected_client}'
-                if summary_key in st.session_state: new_history += f" (Strategy: {st.session_state[summary_key][:50]}...)"
-                cursor.execute("UPDATE clients SET history = ? WHERE student = ?", (new_history, selected_client))
-                conn.commit()
-                for client in st.session_state['client_db']:
-                    if client['student'] == selected_client:
-                        client['history'] = new_history
-                        break
-                st.success(f"SAVED: {selected_client}")
+            strategy = st.session_state.get(f'roadmap_summary_{client_id}', "")
+            utils.log_session_event(client_id, "Career Roadmap", notes=aspirations, ai_context=strategy)
+            st.success(f"SAVED: {selected_client}")
 
 elif session_type == "Networking Strategy":
     st.header(f"NETWORKING STRATEGY: {selected_client}")
@@ -448,21 +412,8 @@ elif session_type == "Networking Strategy":
     mentor_notes = st.text_area("MENTOR NOTES", height=100)
 
     if st.button("SAVE NETWORKING PROTOCOL"):
-        if selected_client == "Guest / Walk-in": st.error("Cannot save guest.")
+        if client_id is None: st.error("Cannot save guest.")
         else:
-            timestamp = datetime.date.today().strftime("%m/%d")
             score = sum([is_concise, has_time, has_cg]) # Simplified scoring
-            history_entry = f" | {timestamp}: Networking Strategy ({score}/3 Rules Passed)"
-            conn = utils.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT history FROM clients WHERE student = ?", (selected_client,))
-            row = cursor.fetchone()
-            if row:
-                new_history = (row['history'] or "") + history_entry
-                cursor.execute("UPDATE clients SET history = ? WHERE student = ?", (new_history, selected_client))
-                conn.commit()
-                for client in st.session_state['client_db']:
-                    if client['student'] == selected_client:
-                        client['history'] = new_history
-                        break
-                st.success(f"SAVED: {selected_client}")
+            utils.log_session_event(client_id, "Networking Strategy", notes=mentor_notes, scores={"rules_passed": score, "out_of": 3})
+            st.success(f"SAVED: {selected_client}")
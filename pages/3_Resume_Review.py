@@ -1,10 +1,7 @@
 import streamlit as st
 import utils
-import re
-import json
-import io
-import datetime
-from docxtpl import DocxTemplate
+import resume_engine
+import document_engine
 
 st.set_page_config(page_title="Resume Engine | WSO OS", layout="wide")
 utils.load_css()
@@ -12,14 +9,31 @@ utils.init_db()
 
 st.title("WSO RESUME ENGINE")
 
+# --- 0. BOOK-WIDE AUDIT ---
+# Only queried when opened; unchanged resumes keep their stored audit on re-runs
+audit_box = st.expander("📊 COMPLIANCE LEADERBOARD (ALL CLIENTS)", key="audit_board", on_change="rerun")
+if audit_box.open:
+    with audit_box:
+        if st.button("🔄 RUN BATCH AUDIT", key="run_batch_audit"):
+            with st.spinner("Auditing resumes..."):
+                counts = utils.audit_resume_book()
+            st.success(f"✅ AUDITED {counts['audited']} | UNCHANGED {counts['skipped']}")
+        board = utils.resume_leaderboard()
+        if board.empty: st.caption("No audits yet. Run the batch audit.")
+        else: st.dataframe(board, hide_index=True, use_container_width=True)
+
 # --- 1. CLIENT SELECTION ---
-client_names = [c['student'] for c in st.session_state['client_db']]
-if not client_names:
+choices = utils.client_choices()
+if not choices:
     st.warning("No clients in database. Go to Intake first.")
     st.stop()
 
-selected_client_name = st.selectbox("SELECT CANDIDATE FROM DATABASE", client_names)
-client_data = next((c for c in st.session_state['client_db'] if c['student'] == selected_client_name), None)
+selected_client_id = st.selectbox("SELECT CANDIDATE FROM DATABASE", list(choices), format_func=choices.get)
+client_data = utils.get_client(selected_client_id)
+if client_data is None:
+    st.warning("This client was deleted in another session. Select another candidate.")
+    st.stop()
+selected_client_name = client_data['student']
 resume_text = client_data.get('resume_text', "")
 is_experienced = client_data.get('is_experienced', 0) == 1
 
@@ -50,11 +64,21 @@ if review_stage == "STAGE 1: INITIAL AUDIT & QUESTIONS":
             st.text(resume_text)
     with c2:
         with st.expander("🔍 VIEW WEAK LANGUAGE HIGHLIGHTS", expanded=True):
-            forbidden = ["responsible for", "assisted with", "helped", "worked on"]
-            highlighted = resume_text
-            for w in forbidden:
-                pattern = re.compile(re.escape(w), re.IGNORECASE)
-                highlighted = pattern.sub(f'<span style="background-color:#ffcccc;color:#900;">{w}</span>', highlighted)
+            # Only bullets edited since the last audit are re-matched; the delta is against the stored audit
+            baseline = utils.get_resume_audit(selected_client_id)
+            sanitizer = resume_engine.ResumeSanitizer(resume_text)
+            issues, score = sanitizer.run_incremental_audit(previous=baseline)
+            st.caption(f"WSO COMPLIANCE SCORE: {score}/100 | {len(issues)} ISSUE(S)")
+            delta = sanitizer.delta
+            if resume_text and (baseline is None or baseline['audit_key'] != resume_engine.audit_key(resume_text)):
+                if delta:
+                    st.markdown(f"**SINCE LAST AUDIT ({baseline['audited_at']}):** SCORE {delta['score_change']:+d} | {delta['bullets_changed']} BULLET(S) CHANGED, {delta['bullets_removed']} REMOVED")
+                    for issue in delta['fixed']: st.markdown(f"✅ FIXED: {issue}")
+                    for issue in delta['introduced']: st.markdown(f"⚠️ NEW: {issue}")
+                if st.button("📌 SAVE AS AUDIT BASELINE", key="save_audit_baseline"):
+                    utils.save_resume_audit(selected_client_id, resume_text, sanitizer.result)
+                    st.rerun()
+            highlighted = resume_engine.highlight(resume_text or "", sanitizer.spans)
             st.markdown(highlighted.replace('\n', '<br>'), unsafe_allow_html=True)
 
     st.markdown("---")
@@ -62,7 +86,7 @@ if review_stage == "STAGE 1: INITIAL AUDIT & QUESTIONS":
     if st.button("🤖 GENERATE QUESTIONNAIRE DRAFT", use_container_width=True):
         with st.spinner("Analyzing..."):
             try:
-                model = utils.AIEngine()
+                model = utils.get_ai_engine()
                 prompt = f"""
                 You are a strict Head Mentor at Wall Street Oasis. Write a direct email to {selected_client_name}.
                 CV CONTENT: {resume_text}
@@ -83,7 +107,7 @@ if review_stage == "STAGE 1: INITIAL AUDIT & QUESTIONS":
 elif review_stage == "STAGE 2: REDRAFT (WITH CLIENT INPUT)":
     st.info(f"GOAL: REDRAFT RESUME FOR {selected_client_name}.")
     
-    template_file = "WSO Academy Resume Template - Deal Experience.docx" if is_experienced else "WSO Academy Resume Template.docx"
+    template_file = document_engine.resume_template(is_experienced)
     
     c1, c2 = st.columns([1, 1])
     with c1:
@@ -92,33 +116,25 @@ elif review_stage == "STAGE 2: REDRAFT (WITH CLIENT INPUT)":
         if st.button("GENERATE & SAVE WORD DOC"):
             if not client_response: st.error("Need client responses.")
             else:
-                with st.spinner("Redrafting..."):
-                    try:
-                        model = utils.AIEngine()
-                        prompt = f"""
-                        Redraft this CV into WSO JSON format.
-                        CV: {resume_text}
-                        Updates: {client_response}
-                        Return JSON with keys: education_section, experience_section, leadership_section, additional_section.
-                        """
-                        response = model.generate_content(prompt, config={"response_mime_type": "application/json"})
-                        data = json.loads(response.text)
-                        
-                        # Save to Vault
-                        conn = utils.get_db_connection()
-                        conn.cursor().execute("UPDATE clients SET latest_resume_json = ? WHERE student = ?", (json.dumps(data), selected_client_name))
-                        conn.commit()
-                        
-                        # Cache text for logging
-                        st.session_state['ai_output_cache'] = "Redraft Generated & Saved to Vault."
-                        
-                        # Render Download
-                        doc = DocxTemplate(template_file)
-                        doc.render(data)
-                        bio = io.BytesIO()
-                        doc.save(bio)
-                        st.download_button("⬇️ DOWNLOAD RESUME", bio.getvalue(), f"{selected_client_name}_WSO_Resume.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
-                    except Exception as e: st.error(f"Error: {e}")
+                prompt = f"""
+                Redraft this CV into WSO JSON format.
+                CV: {resume_text}
+                Updates: {client_response}
+                Return JSON with keys: education_section, experience_section, leadership_section, additional_section.
+                """
+                # AI call + vault save run on the job queue; same inputs -> same job, never a second redraft
+                st.session_state.pop(f"redraft_{selected_client_id}", None)
+                utils.start_job(f"redraft_job_{selected_client_id}", "resume_redraft", {"client_id": selected_client_id, "prompt": prompt},
+                                key=utils.job_key("resume_redraft", selected_client_id, prompt))
+
+        def store_redraft(data):
+            st.session_state[f"redraft_{selected_client_id}"] = data
+            # Cache text for logging
+            st.session_state['ai_output_cache'] = "Redraft Generated & Saved to Vault."
+        utils.job_panel(f"redraft_job_{selected_client_id}", store_redraft, "REDRAFTING...")
+        if st.session_state.get(f"redraft_{selected_client_id}"):
+            try: st.download_button("⬇️ DOWNLOAD RESUME", document_engine.render_docx(template_file, st.session_state[f"redraft_{selected_client_id}"]), f"{selected_client_name}_WSO_Resume.docx", document_engine.DOCX_MIME)
+            except Exception as e: st.error(f"Error: {e}")
 
 # =========================================================
 # 📝 LOGGING SECTION (NEW FEATURE)
@@ -135,34 +151,7 @@ with st.container(border=True):
         feedback_notes = st.text_area("MENTOR FEEDBACK / NOTES", height=100, placeholder="e.g., Weak verbs in the PE experience section.")
 
     if st.button("💾 SAVE SESSION TO HISTORY", type="primary", use_container_width=True):
-        timestamp = datetime.date.today().strftime("%m/%d")
-        
-        # Capture AI Context (The questions asked or redraft status)
-        context_to_save = st.session_state.get('ai_output_cache', 'No AI generation this session.')
-        
-        # Create detailed log entry
-        log_entry = f"""
-        | {timestamp}: Resume Review (Score: {resume_score}/10)
-        | NOTES: {feedback_notes}
-        | AI CONTEXT/QUESTIONS ASKED: {context_to_save[:500]}... [Truncated for DB]
-        """
-        # Clean up newlines for the 'pipe' format
-        log_entry_clean = " ".join(log_entry.split())
-
-        conn = utils.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT history FROM clients WHERE student = ?", (selected_client_name,))
-        row = cursor.fetchone()
-        
-        if row:
-            new_hist = (row['history'] or "") + " | " + log_entry_clean
-            cursor.execute("UPDATE clients SET history = ? WHERE student = ?", (new_hist, selected_client_name))
-            conn.commit()
-            
-            # Sync Session State
-            for c in st.session_state['client_db']:
-                if c['student'] == selected_client_name:
-                    c['history'] = new_hist
-                    break
-            
-            st.success("✅ Session Logged. Context saved for future reference.")
+        # Capture AI Context (The questions asked or redraft status) - stored in full on the event row
+        context_to_save = st.session_state.get('ai_output_cache') or 'No AI generation this session.'
+        utils.log_session_event(selected_client_id, "Resume Review", notes=feedback_notes, scores={"rating": resume_score}, ai_context=context_to_save)
+        st.success("✅ Session Logged. Context saved for future reference.")
@@ -15,8 +15,11 @@ col1, col2 = st.columns([1, 2])
 
 with col1:
     st.markdown("### TARGET")
-    client_names = [c['student'] for c in st.session_state['client_db']]
-    target_client = st.selectbox("RECIPIENT", ["Generic / Prospective"] + client_names)
+    choices = utils.client_choices()
+    target_id = st.selectbox("RECIPIENT", [None] + list(choices), format_func=lambda cid: "Generic / Prospective" if cid is None else choices[cid])
+    # get_client is None if the client was deleted in another session since the list was built: draft generically
+    target_data = utils.get_client(target_id) if target_id is not None else None
+    target_client = "Generic / Prospective" if target_data is None else target_data['student']
     
     st.markdown("### CONTEXT")
     comm_type = st.selectbox("MESSAGE TYPE", [
@@ -38,7 +41,7 @@ with col2:
 st.markdown("---")
 
 # --- 2. THE PROMPT ENGINE ---
-def get_gemini_draft(client, c_type, plat, points):
+def build_draft_prompt(client, c_type, plat, points):
     
     # Dynamic Rule Injection based on context
     context_rules = ""
@@ -69,11 +72,21 @@ def get_gemini_draft(client, c_type, plat, points):
     - Do NOT use emojis unless strictly necessary for tone (but generally avoid).
     - You must respond strictly with a valid JSON object containing exactly two keys: "subject" and "body". Do not wrap in markdown block.
     """
+    return system_instruction
+
+def parse_draft(response):
+    if isinstance(response, Exception):
+        return {"subject": "ERROR", "body": f"AI Generation Failed: {str(response)}"}
+    try: return json.loads(response.text)
+    except Exception as e: return {"subject": "ERROR", "body": f"AI Generation Failed: {str(e)}"}
+
+def get_gemini_draft(client, c_type, plat, points):
+    system_instruction = build_draft_prompt(client, c_type, plat, points)
 
     with st.spinner("CONTACTING NEURAL ENGINE..."):
         try:
-            # Initialize Robust AI Engine
-            engine = utils.AIEngine()
+            # Shared, warm AI engine (one per process)
+            engine = utils.get_ai_engine()
             
             response = engine.generate_content(
                 system_instruction,
@@ -100,3 +113,24 @@ if st.button("GENERATE AI DRAFT"):
         # Clipboard Helper
         st.caption("Copy raw text below:")
         st.code(result.get("body", ""), language="markdown")
+
+# --- 4. BATCH: TODAY'S CLIENTS ---
+st.markdown("---")
+today_str = datetime.date.today().strftime("%Y-%m-%d")
+todays_clients = [c['student'] for c in utils.list_clients_between(today_str, today_str)]
+st.markdown(f"### BATCH FOLLOW-UPS ({len(todays_clients)} CLIENTS TODAY)")
+st.caption("Uses the message type, platform and key points above for every client with a session today. Drafts run in parallel.")
+
+if st.button("GENERATE DRAFTS FOR ALL OF TODAY'S CLIENTS", disabled=not todays_clients):
+    if not key_points:
+        st.warning("ENTER KEY POINTS TO GUIDE THE AI.")
+    else:
+        with st.spinner(f"DRAFTING {len(todays_clients)} FOLLOW-UPS..."):
+            engine = utils.get_ai_engine()
+            prompts = [build_draft_prompt(name, comm_type, platform, key_points) for name in todays_clients]
+            responses = engine.generate_many(prompts, config={"response_mime_type": "application/json"}, concurrency=8)
+            st.session_state['batch_drafts'] = [(name, parse_draft(r)) for name, r in zip(todays_clients, responses)]
+
+for name, draft in st.session_state.get('batch_drafts', []):
+    with st.expander(f"✉️ {name}: {draft.get('subject', '')}"):
+        st.code(draft.get("body", ""), language="markdown")
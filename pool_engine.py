@@ -0,0 +1,64 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# One process pool for all CPU-bound batch work (parsing, rendering, audits, process jobs); 0 = one worker per core
+POOL_WORKERS = int(os.environ.get("MENTOROS_POOL_WORKERS", "0")) or (os.cpu_count() or 1)
+# Workers start from a clean forkserver, not as forks of the multi-threaded Streamlit server (whose held locks they'd inherit)
+POOL_START_METHOD = "forkserver"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """The shared ProcessPoolExecutor, created on first use and kept warm across clicks."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context(POOL_START_METHOD))
+        return _pool
+
+def reset_pool(pool):
+    """Drops a broken pool (a worker died: OOM, segfault) so the next get_pool() builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool: _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def call_safely(fn, *args):
+    """fn(*args) as (result, None), or (None, error message) if it raised. Used for batch work (often
+    inside pool workers) so one bad item is reported as data instead of sinking the whole batch."""
+    try: return fn(*args), None
+    except Exception as e: return None, str(e)
+
+def _run_chunk(fn, chunk):
+    return [call_safely(fn, *args) for args in chunk]
+
+def run_many(fn, items, min_items=2, chunksize=None):
+    """Yields (index, (result, error)) for fn(*args) over `items` (argument tuples) as they complete.
+
+    Batches smaller than `min_items` (or a single-core box) run in-process; the rest go to the shared
+    pool in chunks (default: ~4 chunks per worker). fn must be a module-level function.
+    """
+    items = list(items)
+    if POOL_WORKERS <= 1 or len(items) < max(2, min_items):
+        for idx, args in enumerate(items): yield idx, call_safely(fn, *args)
+        return
+    chunksize = chunksize or max(1, len(items) // (POOL_WORKERS * 4))
+    pool = get_pool()
+    try:
+        futures = {pool.submit(_run_chunk, fn, items[start:start + chunksize]): start for start in range(0, len(items), chunksize)}
+        for future in as_completed(futures):
+            for offset, outcome in enumerate(future.result()): yield futures[future] + offset, outcome
+    except BrokenProcessPool:
+        reset_pool(pool)
+        raise
+
+def map_many(fn, items, min_items=2, chunksize=None):
+    """run_many collected into a list of (result, error) in input order."""
+    items = list(items)
+    outcomes = [None] * len(items)
+    for idx, outcome in run_many(fn, items, min_items, chunksize): outcomes[idx] = outcome
+    return outcomes
@@ -0,0 +1,194 @@
+import io
+import zipfile
+import datetime
+import functools
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.lib import colors
+from pypdf import PdfWriter
+import db_engine
+import pool_engine
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 50
+BODY_FONT, BODY_SIZE, BODY_LEADING = "Helvetica", 10, 13
+SPARKLINE_POINTS = 12
+
+# --- TEXT LAYOUT ---
+@functools.lru_cache(maxsize=65536)
+def text_width(text, font=BODY_FONT, size=BODY_SIZE):
+    """stringWidth with a cache: report text is mostly the same words over and over."""
+    return pdfmetrics.stringWidth(text, font, size)
+
+def wrap(text, max_width, font=BODY_FONT, size=BODY_SIZE):
+    """Greedy word wrap on real glyph widths. Keeps blank lines; words wider than a line are split."""
+    space = text_width(" ", font, size)
+    lines = []
+    for paragraph in (text or "").split("\n"):
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            width = text_width(word, font, size)
+            while width > max_width:
+                # Hard-break an overlong token (URLs, pasted tables) at the last character that fits
+                if line: lines.append(" ".join(line)); line, line_width = [], 0.0
+                cut = next(i for i in range(len(word), 0, -1) if text_width(word[:i], font, size) <= max_width or i == 1)
+                lines.append(word[:cut])
+                word = word[cut:]
+                width = text_width(word, font, size)
+            if line and line_width + space + width > max_width:
+                lines.append(" ".join(line))
+                line, line_width = [], 0.0
+            line_width += (space if line else 0.0) + width
+            line.append(word)
+        lines.append(" ".join(line))
+    return lines
+
+class PageWriter:
+    """A canvas plus a y cursor that starts a new page (with the running header and footer) when it runs out of room."""
+    def __init__(self, c, student):
+        self.c = c
+        self.student = student
+        self.page = 1
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def footer(self):
+        self.c.setFont("Times-Italic", 10)
+        self.c.drawString(MARGIN, MARGIN, "Wall Street Oasis Mentor OS - Confidential")
+        self.c.drawRightString(PAGE_WIDTH - MARGIN, MARGIN, f"PAGE {self.page}")
+
+    def new_page(self):
+        self.footer()
+        self.c.showPage()
+        self.page += 1
+        self.c.setFont("Helvetica-Bold", 10)
+        self.c.drawString(MARGIN, PAGE_HEIGHT - MARGIN + 10, f"{self.student} (CONTINUED)")
+        self.y = PAGE_HEIGHT - MARGIN - 15
+
+    def need(self, height):
+        if self.y - height < MARGIN + 20: self.new_page()
+
+    def heading(self, text):
+        self.need(35)
+        self.y -= 20
+        self.c.setFont("Helvetica-Bold", 12)
+        self.c.drawString(MARGIN, self.y, text)
+        self.y -= 8
+
+    def paragraph(self, text, font=BODY_FONT, size=BODY_SIZE, leading=BODY_LEADING):
+        for line in wrap(text, PAGE_WIDTH - 2 * MARGIN, font, size):
+            self.need(leading)
+            self.y -= leading
+            self.c.setFont(font, size)
+            self.c.drawString(MARGIN, self.y, line)
+
+def sparkline(c, x, y, width, height, history):
+    """Tech (solid) and behavioral (dashed) scores across the last mocks, on a fixed 0-10 scale."""
+    c.setLineWidth(0.5)
+    c.setStrokeColor(colors.grey)
+    c.rect(x, y, width, height, stroke=1, fill=0)
+    points = history[-SPARKLINE_POINTS:]
+    if len(points) < 2:
+        c.setFont("Helvetica", 8)
+        c.drawString(x + 5, y + height / 2 - 3, "TREND AFTER 2+ MOCKS")
+        c.setStrokeColor(colors.black)
+        return
+    step = width / (len(points) - 1)
+    for idx, dash in ((0, []), (1, [2, 2])):
+        coords = [(x + i * step, y + height * min(max(float(p[idx]), 0), 10) / 10) for i, p in enumerate(points)]
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(1.2)
+        c.setDash(dash)
+        c.lines([(*a, *b) for a, b in zip(coords, coords[1:])])
+    c.setDash([])
+    c.setFont("Helvetica", 7)
+    c.drawString(x, y - 9, f"TECH — / BEH - -  (LAST {len(points)} MOCKS)")
+
+# --- REPORT CARDS ---
+def draw_report(c, card):
+    """Draws one report card (one or more pages) onto canvas `c`.
+
+    card: student, tech_score, beh_score (None before the first mock), feedback, agenda,
+    history [(tech, beh), ...] oldest first, date (optional datetime.date).
+    """
+    top = PAGE_HEIGHT - MARGIN
+    c.setLineWidth(2)
+    c.line(MARGIN, top, PAGE_WIDTH - MARGIN, top)
+    c.setFont("Times-Bold", 24)
+    c.drawString(MARGIN, top + 10, "WSO ACADEMY | PERFORMANCE CARD")
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(MARGIN, top - 30, f"CANDIDATE: {card['student']}")
+    c.drawString(MARGIN, top - 50, f"DATE: {(card.get('date') or datetime.date.today()).strftime('%B %d, %Y')}")
+
+    tech, beh = card.get('tech_score'), card.get('beh_score')
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(MARGIN, top - 90, "SESSION SCORES:")
+    c.setFillColor(colors.black)
+    c.setLineWidth(1)
+    c.rect(MARGIN, top - 140, 200, 40, stroke=1, fill=0)
+    c.setFont("Helvetica", 12)
+    c.drawString(MARGIN + 10, top - 115, f"TECHNICAL: {'-' if tech is None else f'{tech:g}'}/10")
+    c.drawString(MARGIN + 10, top - 130, f"BEHAVIORAL: {'-' if beh is None else f'{beh:g}'}/10")
+    if tech is None or beh is None: verdict = "NO MOCK YET"
+    else: verdict = "STRONG HIRE" if (tech + beh) / 2 >= 8 else "NEEDS POLISH"
+    c.drawString(MARGIN + 230, top - 115, f"VERDICT: {verdict}")
+    sparkline(c, MARGIN + 230, top - 145, PAGE_WIDTH - 2 * MARGIN - 230, 25, card.get('history') or [])
+
+    writer = PageWriter(c, card['student'])
+    writer.y = top - 165
+    writer.heading("MENTOR FEEDBACK & NOTES:")
+    writer.paragraph(card.get('feedback') or "No notes recorded.")
+    if card.get('agenda'):
+        writer.heading("SESSION AGENDA:")
+        writer.paragraph(card['agenda'])
+    writer.footer()
+    c.showPage()
+
+def render_report(card):
+    """One report card as PDF bytes."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    draw_report(c, card)
+    c.save()
+    return buffer.getvalue()
+
+def render_many(cards, fmt="PDF"):
+    """Renders report cards over the shared process pool. fmt 'PDF' merges them into one multi-page PDF
+    (in input order); 'ZIP' bundles one PDF per card. Returns (bytes, {student: error})."""
+    cards = list(cards)
+    outcomes = pool_engine.map_many(render_report, [(card,) for card in cards])
+    errors = {card['student']: error for card, (_, error) in zip(cards, outcomes) if error}
+    out = io.BytesIO()
+    if fmt == "ZIP":
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+            for card, (data, _) in zip(cards, outcomes):
+                if data is not None: archive.writestr(f"WSO_Report_{card['student']}_{card.get('client_id', '')}.pdf", data)
+    else:
+        merged = PdfWriter()
+        for data, _ in outcomes:
+            if data is not None: merged.append(io.BytesIO(data))
+        merged.write(out)
+    return out.getvalue(), errors
+
+def week_cards(conn, start, end):
+    """Report-card inputs for every client with a session in [start, end]: latest mock scores, the
+    mock trend, and the latest logged session's notes and agenda."""
+    clients = conn.execute("SELECT id, student FROM clients WHERE session_date BETWEEN ? AND ? ORDER BY session_date, time",
+                           (str(start), str(end))).fetchall()
+    cards = []
+    for client_id, student in clients:
+        history = [tuple(r) for r in conn.execute("SELECT tech, beh FROM mock_scores WHERE client_id = ? ORDER BY id DESC LIMIT ?", (client_id, SPARKLINE_POINTS)).fetchall()][::-1]
+        event = conn.execute("SELECT notes, ai_context FROM session_events WHERE client_id = ? ORDER BY created_at DESC, id DESC LIMIT 1", (client_id,)).fetchone()
+        cards.append({"client_id": client_id, "student": student, "tech_score": history[-1][0] if history else None,
+                      "beh_score": history[-1][1] if history else None, "history": history,
+                      "feedback": event[0] if event else "", "agenda": event[1] if event else ""})
+    return cards
+
+def week_reports(db_path, start, end, fmt="PDF"):
+    """Report cards for the week as one PDF / ZIP. Uses its own read-only connection, so it is safe
+    to call from st.download_button's deferred-data thread."""
+    conn = db_engine.connect(db_path, read_only=True)
+    try: cards = week_cards(conn, start, end)
+    finally: conn.close()
+    return render_many(cards, fmt)[0]
@@ -1,59 +1,201 @@
 import re
+import json
+import hashlib
+import datetime
+from collections import Counter
+import pandas as pd
+import streamlit as st
+import cache_engine
+import pool_engine
+
+# --- AUDIT RULES ---
+# Declarative WSO compliance rules. A rule matches either a list of literal `phrases` or a regex
+# `pattern` (use (?:...) groups only, and never match across a line break). All rules are compiled
+# into one case-insensitive alternation, so the resume is scanned once however many rules there are.
+# By default each distinct phrase found costs `penalty` and adds `message` ({match} is the phrase);
+# `once` reports a rule a single time and `check(hits)` replaces the default with its own list of
+# (message, penalty). A hit is (start, end, matched_text).
+WEAK_PHRASES = ["responsible for", "assisted with", "helped", "worked on"]
+LOW_GPA = 3.0
+MAJOR_GPA_WAIVER = 3.2
+
+def _check_gpa(hits):
+    # Rule: IF GPA < 3.0, REMOVE it (unless major GPA > 3.2)
+    gpas = [(found.lower().startswith("major"), float(re.search(r"\d\.\d+$", found).group())) for _, _, found in hits]
+    if any(is_major and gpa > MAJOR_GPA_WAIVER for is_major, gpa in gpas): return []
+    return [(f"CRITICAL: Found GPA {gpa} (< {LOW_GPA}). MUST REMOVE unless Major GPA > {MAJOR_GPA_WAIVER}.", 20) for _, gpa in gpas if gpa < LOW_GPA]
+
+def _check_section_order(hits):
+    # Rule: Education goes BELOW Experience for experienced hires
+    firsts = {}
+    for start, _, found in hits: firsts.setdefault(found.upper(), start)
+    if "EDUCATION" in firsts and "EXPERIENCE" in firsts and firsts["EDUCATION"] < firsts["EXPERIENCE"]:
+        return [("FORMATTING: 'Education' is above 'Experience'. Verify if candidate is Experienced Hire (>1 year FT). If so, swap.", 0)]
+    return []
+
+RULES = [
+    {"id": "gpa", "pattern": r"(?:major[ \t]+)?GPA[ \t]*[:\-]?[ \t]*\d\.\d+", "check": _check_gpa},
+    # Rule: NO objective statements
+    {"id": "objective", "phrases": ["objective"], "once": True, "penalty": 15,
+     "message": "CRITICAL: 'OBJECTIVE' section found. Delete immediately. Reallocate space to deal experience."},
+    # Rule: Bullets must be Result/Impact. "Responsible for" is the enemy of a WSO resume.
+    {"id": "weak_language", "phrases": WEAK_PHRASES, "penalty": 5, "highlight": True,
+     "message": "WEAK LANGUAGE: Found '{match}'. Replace with active verbs (e.g., 'Spearheaded', 'Executed')."},
+    {"id": "section_order", "phrases": ["education", "experience"], "check": _check_section_order},
+]
+
+def _trie_pattern(phrases):
+    """Regex for a set of lowercase literals as a prefix trie, so a position that starts no phrase
+    fails on its first character instead of trying every phrase. Longer phrases win."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase: node = node.setdefault(ch, {})
+        node[""] = {}
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches: return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return emit(trie)
+
+class RuleSet:
+    """RULES compiled into a single regex: one named group per pattern rule, plus one trie over
+    every literal phrase (mapped back to its rule on match)."""
+    def __init__(self, rules):
+        self.rules = {f"r{i}": rule for i, rule in enumerate(rules)}
+        self.phrase_groups = {}
+        parts = []
+        for group, rule in self.rules.items():
+            if "pattern" in rule: parts.append(f"(?P<{group}>{rule['pattern']})")
+            for phrase in rule.get("phrases", []): self.phrase_groups.setdefault(phrase.lower(), group)
+        if self.phrase_groups: parts.append(f"(?P<phrase>{_trie_pattern(self.phrase_groups)})")
+        self.regex = re.compile("|".join(parts) or "(?!)", re.IGNORECASE)
+        # Identifies this rule set in stored audits: editing a rule invalidates them
+        spec = json.dumps(rules, sort_keys=True, default=lambda f: f.__name__)
+        self.digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+    def hits(self, text):
+        """[(rule group, start, end, matched_text)] for one pass over `text`."""
+        out = []
+        for m in self.regex.finditer(text):
+            found = m.group()
+            out.append((self.phrase_groups[found.lower()] if m.lastgroup == "phrase" else m.lastgroup, m.start(), m.end(), found))
+        return out
+
+    def evaluate(self, hits):
+        """Turns hits into {'issues', 'score', 'spans'}; spans are (start, end, rule_id) for the
+        rules marked `highlight`, in text order."""
+        found = {group: [] for group in self.rules}
+        for group, start, end, text in hits: found[group].append((start, end, text))
+        issues, score, spans = [], 100, []
+        for group, rule in self.rules.items():
+            rule_hits = found[group]
+            if rule.get("highlight"): spans.extend((start, end, rule["id"]) for start, end, _ in rule_hits)
+            if "check" in rule: results = rule["check"](rule_hits)
+            else:
+                distinct = list(dict.fromkeys(text.lower() for _, _, text in rule_hits))
+                if rule.get("once"): distinct = distinct[:1]
+                results = [(rule["message"].format(match=phrase), rule["penalty"]) for phrase in distinct]
+            for message, penalty in results:
+                issues.append(message)
+                score -= penalty
+        spans.sort()
+        return {"issues": issues, "score": score, "spans": spans}
+
+    def scan(self, text):
+        return self.evaluate(self.hits(text or ""))
+
+    def scan_incremental(self, text, cache):
+        """Same result as scan(), but hits are cached per bullet (line) hash: after an edit only the
+        changed bullets are matched again. Adds 'bullet_hashes' and 'rescanned' to the result."""
+        hits, hashes, rescanned = [], [], 0
+        for offset, line in split_bullets(text):
+            digest = bullet_hash(line)
+            hashes.append(digest)
+            key = f"{self.digest}:{digest}"
+            line_hits = cache.get(key)
+            if line_hits is None:
+                line_hits = self.hits(line)
+                cache.put(key, line_hits)
+                rescanned += 1
+            hits.extend((group, offset + start, offset + end, found) for group, start, end, found in line_hits)
+        result = self.evaluate(hits)
+        result.update(bullet_hashes=hashes, rescanned=rescanned)
+        return result
+
+DEFAULT_RULES = RuleSet(RULES)
+
+def highlight(text, spans, style="background-color:#ffcccc;color:#900;"):
+    """HTML for `text` with each (start, end, ...) span wrapped in a styled <span>, built in one pass."""
+    out, pos = [], 0
+    for start, end, *_ in spans:
+        if start < pos: continue
+        out.append(text[pos:start])
+        out.append(f'<span style="{style}">{text[start:end]}</span>')
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
+# --- INCREMENTAL AUDIT ---
+BULLET_CACHE_MAX_ENTRIES = 20000
+
+def split_bullets(text):
+    """[(offset, line)] for every non-blank line: section headings and bullets alike."""
+    bullets, offset = [], 0
+    for line in (text or "").splitlines(keepends=True):
+        if line.strip(): bullets.append((offset, line))
+        offset += len(line)
+    return bullets
+
+def bullet_hash(line):
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()[:16]
+
+def bullet_hashes(text):
+    return [bullet_hash(line) for _, line in split_bullets(text)]
+
+@st.cache_resource
+def get_bullet_cache():
+    # Process-wide LRU of per-bullet rule hits, keyed by rule-set digest + bullet hash
+    return cache_engine.LRUCache(BULLET_CACHE_MAX_ENTRIES)
+
+def audit_delta(previous, current):
+    """What changed since a stored audit: issues fixed / introduced (per occurrence), score change,
+    and how many bullets are new or gone. None when there is nothing to compare against."""
+    if not previous or previous.get("score") is None: return None
+    before, after = Counter(previous.get("issues") or []), Counter(current["issues"])
+    old_bullets, new_bullets = set(previous.get("bullet_hashes") or []), set(current["bullet_hashes"])
+    return {
+        "score_change": current["score"] - previous["score"],
+        "fixed": list((before - after).elements()),
+        "introduced": list((after - before).elements()),
+        "bullets_changed": len(new_bullets - old_bullets),
+        "bullets_removed": len(old_bullets - new_bullets),
+    }
 
 class ResumeSanitizer:
-    def __init__(self, text):
+    def __init__(self, text, rules=DEFAULT_RULES):
         self.text = text
+        self.rules = rules
         self.issues = []
         self.score = 100
+        self.spans = []
+        self.result = None
+        self.delta = None
 
     def run_audit(self):
-        """Runs all WSO compliance checks."""
-        self._check_gpa()
-        self._check_objective()
-        self._check_forbidden_words()
-        self._check_section_order()
+        """Runs all WSO compliance checks in a single scan."""
+        result = self.rules.scan(self.text)
+        self.issues, self.score, self.spans = result["issues"], result["score"], result["spans"]
         return self.issues, self.score
 
-    def _check_gpa(self):
-        # Rule: IF GPA < 3.0, REMOVE it (unless major GPA > 3.2)
-        gpa_pattern = r"GPA\s*[:\-]?\s*(\d\.\d+)"
-        matches = re.findall(gpa_pattern, self.text, re.IGNORECASE)
-        
-        for gpa in matches:
-            try:
-                score = float(gpa)
-                if score < 3.0:
-                    # Check for Major GPA context nearby (simplified logic)
-                    if "major" not in self.text.lower() or "3.2" not in self.text:
-                        self.issues.append(f"CRITICAL: Found GPA {score} (< 3.0). MUST REMOVE unless Major GPA > 3.2.")
-                        self.score -= 20
-            except ValueError:
-                pass
-
-    def _check_objective(self):
-        # Rule: NO objective statements
-        if "OBJECTIVE" in self.text.upper():
-            self.issues.append("CRITICAL: 'OBJECTIVE' section found. Delete immediately. Reallocate space to deal experience.")
-            self.score -= 15
-
-    def _check_forbidden_words(self):
-        # Rule: Bullets must be Result/Impact. Avoid passive voice.
-        # "Responsible for" is the enemy of a WSO resume.
-        forbidden = ["responsible for", "assisted with", "helped", "worked on"]
-        for word in forbidden:
-            if word in self.text.lower():
-                self.issues.append(f"WEAK LANGUAGE: Found '{word}'. Replace with active verbs (e.g., 'Spearheaded', 'Executed').")
-                self.score -= 5
-
-    def _check_section_order(self):
-        # Rule: Education goes BELOW Experience for experienced hires
-        # Heuristic: If "Professional Experience" appears after "Education", flag it for review.
-        edu_idx = self.text.upper().find("EDUCATION")
-        exp_idx = self.text.upper().find("EXPERIENCE")
-        
-        if edu_idx > -1 and exp_idx > -1:
-            if edu_idx < exp_idx:
-                self.issues.append("FORMATTING: 'Education' is above 'Experience'. Verify if candidate is Experienced Hire (>1 year FT). If so, swap.")
+    def run_incremental_audit(self, previous=None, cache=None):
+        """run_audit for V2, V3...: reuses cached per-bullet hits and fills self.delta against
+        `previous` (a stored audit: score, issues, bullet_hashes)."""
+        self.result = self.rules.scan_incremental(self.text, cache or get_bullet_cache())
+        self.issues, self.score, self.spans = self.result["issues"], self.result["score"], self.result["spans"]
+        self.delta = audit_delta(previous, self.result)
+        return self.issues, self.score
 
     def generate_email_draft(self, student_name):
         # Rule: Turnaround 48 hrs for 1st draft
@@ -78,4 +220,60 @@ Please revise and reply with V2.
 
 Best,
 Head Mentor
-"""
\ No newline at end of file
+"""
+
+# --- BATCH AUDIT ---
+# Below this many resumes the pool costs more than it saves
+AUDIT_POOL_MIN_RESUMES = 64
+
+def audit_key(text, rules=DEFAULT_RULES):
+    """Stored-audit key: the resume text hash under this rule set."""
+    return hashlib.sha256(f"{rules.digest}\n{text}".encode("utf-8")).hexdigest()
+
+def _audit(text):
+    result = DEFAULT_RULES.scan(text)
+    return {"score": result["score"], "issues": result["issues"], "bullet_hashes": bullet_hashes(text)}
+
+def _audit_outcome(outcome):
+    result, error = outcome
+    return result if error is None else {"score": None, "issues": [f"AUDIT ERROR: {error}"], "bullet_hashes": []}
+
+def audit_many(texts):
+    """run_audit over many resume texts, spread over the shared process pool in chunks. Results in input order."""
+    texts = list(texts)
+    return [_audit_outcome(o) for o in pool_engine.map_many(_audit, [(t,) for t in texts], min_items=AUDIT_POOL_MIN_RESUMES)]
+
+def stale_resumes(conn):
+    """([(client_id, audit_key, resume_text)] whose text or rules changed since the stored audit, total resumes)."""
+    rows = conn.execute("SELECT c.id, c.resume_text, a.audit_key FROM clients c LEFT JOIN resume_audits a ON a.client_id = c.id WHERE c.resume_text IS NOT NULL AND c.resume_text != ''").fetchall()
+    stale = []
+    for client_id, text, stored_key in rows:
+        key = audit_key(text)
+        if key != stored_key: stale.append((client_id, key, text))
+    return stale, len(rows)
+
+def store_audits(conn, audits):
+    """Upserts [(client_id, audit_key, result)] (run it as a write job) and drops audits for resumes that were cleared."""
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    conn.executemany("""
+        INSERT INTO resume_audits (client_id, audit_key, score, issue_count, issues, bullet_hashes, audited_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (client_id) DO UPDATE SET audit_key = excluded.audit_key, score = excluded.score, issue_count = excluded.issue_count,
+            issues = excluded.issues, bullet_hashes = excluded.bullet_hashes, audited_at = excluded.audited_at
+    """, [(client_id, key, r["score"], len(r["issues"]), json.dumps(r["issues"]), json.dumps(r.get("bullet_hashes", [])), now) for client_id, key, r in audits])
+    conn.execute("DELETE FROM resume_audits WHERE client_id NOT IN (SELECT id FROM clients WHERE resume_text IS NOT NULL AND resume_text != '')")
+
+def get_audit(conn, client_id):
+    """The stored audit for one client as {'audit_key', 'score', 'issues', 'bullet_hashes', 'audited_at'}, or None."""
+    row = conn.execute("SELECT audit_key, score, issues, bullet_hashes, audited_at FROM resume_audits WHERE client_id = ?", (client_id,)).fetchone()
+    if row is None: return None
+    return {"audit_key": row[0], "score": row[1], "issues": json.loads(row[2] or "[]"), "bullet_hashes": json.loads(row[3] or "[]"), "audited_at": row[4]}
+
+def leaderboard(conn):
+    """Stored audits, worst score first: the mentor triage queue."""
+    board = pd.read_sql_query("""
+        SELECT c.id AS "ID", c.student AS "STUDENT", c.type AS "TRACK", a.score AS "SCORE", a.issue_count AS "ISSUES",
+               a.issues, a.audited_at AS "AUDITED"
+        FROM resume_audits a JOIN clients c ON c.id = a.client_id ORDER BY a.score, a.issue_count DESC, c.student
+    """, conn)
+    board.insert(5, "TOP ISSUE", board.pop("issues").map(lambda issues: (json.loads(issues) or [""])[0]))
+    return board
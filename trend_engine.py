@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Rolling average over each client's last N mocks
+TREND_WINDOW = 3
+# At risk: bottom quartile of the book on recent form, or sliding by this many points per mock
+AT_RISK_PERCENTILE = 25
+AT_RISK_SLOPE = -0.25
+
+TREND_COLUMNS = ["client_id", "Student", "Track", "Mocks", "Last Mock", "Tech Slope", "Beh Slope",
+                 "Tech Rolling", "Beh Rolling", "Percentile", "At Risk", "Reason"]
+
+def load_scores(conn):
+    """Every mock as typed columns, grouped by client in the order they were logged (one narrow query)."""
+    return pd.read_sql_query("""
+        SELECT m.client_id, c.student, c.type, m.mock_date, m.tech, m.beh
+        FROM mock_scores m JOIN clients c ON c.id = m.client_id ORDER BY m.client_id, m.id
+    """, conn)
+
+def compute_trends(scores, window=TREND_WINDOW, risk_percentile=AT_RISK_PERCENTILE, risk_slope=AT_RISK_SLOPE):
+    """Per-client trend table for the whole book in one vectorized pass over load_scores() output.
+
+    Slopes are least-squares points-per-mock (NaN with a single mock), rolling averages cover the
+    last `window` mocks, and Percentile ranks each client's recent combined score against the book.
+    """
+    if scores.empty: return pd.DataFrame(columns=TREND_COLUMNS)
+    groups = scores.groupby("client_id", sort=False)
+    x = groups.cumcount().to_numpy(dtype=float)
+    tech = scores["tech"].to_numpy(dtype=float)
+    beh = scores["beh"].to_numpy(dtype=float)
+
+    # Closed-form slope from grouped sums: (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2)
+    sums = pd.DataFrame({"client_id": scores["client_id"], "x": x, "xx": x * x, "tech": tech, "beh": beh,
+                         "x_tech": x * tech, "x_beh": x * beh}).groupby("client_id", sort=False).sum()
+    n = groups.size().to_numpy(dtype=float)
+    denom = n * sums["xx"].to_numpy() - sums["x"].to_numpy() ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tech_slope = np.where(denom > 0, (n * sums["x_tech"].to_numpy() - sums["x"].to_numpy() * sums["tech"].to_numpy()) / denom, np.nan)
+        beh_slope = np.where(denom > 0, (n * sums["x_beh"].to_numpy() - sums["x"].to_numpy() * sums["beh"].to_numpy()) / denom, np.nan)
+
+    rolling = groups.tail(window).groupby("client_id", sort=False)[["tech", "beh"]].mean()
+    latest = groups[["student", "type", "mock_date"]].last()
+    recent = (rolling["tech"] + rolling["beh"]).to_numpy() / 2
+    percentile = pd.Series(recent).rank(pct=True).to_numpy() * 100
+    sliding = np.nan_to_num((tech_slope + beh_slope) / 2, nan=0.0) <= risk_slope
+    low = percentile <= risk_percentile
+
+    trends = pd.DataFrame({
+        "client_id": sums.index.to_numpy(),
+        "Student": latest["student"].to_numpy(),
+        "Track": latest["type"].to_numpy(),
+        "Mocks": n.astype(int),
+        "Last Mock": latest["mock_date"].to_numpy(),
+        "Tech Slope": np.round(tech_slope, 2),
+        "Beh Slope": np.round(beh_slope, 2),
+        "Tech Rolling": np.round(rolling["tech"].to_numpy(), 1),
+        "Beh Rolling": np.round(rolling["beh"].to_numpy(), 1),
+        "Percentile": np.round(percentile).astype(int),
+        "At Risk": low | sliding,
+        "Reason": np.select([low & sliding, low, sliding], ["Bottom quartile & sliding", "Bottom quartile", "Sliding"], ""),
+    })
+    return trends.sort_values(["At Risk", "Percentile"], ascending=[False, True]).reset_index(drop=True)
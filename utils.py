@@ -1,13 +1,23 @@
 import streamlit as st
 import sqlite3
 import json
-import io
 import datetime
+import os
+import hashlib
+import threading
+import time
+import copy
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from google.api_core import exceptions
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
+import vault_engine
+import db_engine
+import calendar_engine
+import resume_engine
+import analytics_engine
+import report_engine
+import job_engine
 
 def load_css():
     st.markdown("""
@@ -22,40 +32,232 @@ def load_css():
         </style>
         """, unsafe_allow_html=True)
 
+DB_PATH = 'wso_mentor_os.db'
+AI_CACHE_PATH = 'wso_ai_cache.db'
+AI_CACHE_TTL_SECONDS = 7 * 24 * 3600
+AI_CACHE_MAX_ENTRIES = 5000
+
+class CachedResponse:
+    """Stand-in for a Gemini response served from the cache (exposes .text like the real one)."""
+    def __init__(self, text):
+        self.text = text
+
+class ResponseCache:
+    """Persistent SQLite cache of AI responses, keyed by a hash of model + prompt + config."""
+    def __init__(self, path=AI_CACHE_PATH, ttl_seconds=AI_CACHE_TTL_SECONDS, max_entries=AI_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response_text TEXT,
+                    created_at REAL,
+                    last_access REAL
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_cache (last_access)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(model_name, prompt, config):
+        payload = json.dumps([model_name, prompt, config], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, keys):
+        """Returns the first fresh cached text for any of the keys. Counts one hit or miss per call."""
+        now = time.time()
+        with self.lock:
+            for key in keys:
+                row = self.conn.execute("SELECT response_text, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+                if row is None: continue
+                if now - row[1] > self.ttl_seconds:
+                    self.conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                    self.conn.commit()
+                    continue
+                # Touch for LRU ordering
+                self.conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def store(self, key, model_name, text):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO ai_cache (key, model, response_text, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                              (key, model_name, text, now, now))
+            # Expire by TTL, then trim least-recently-used rows beyond the size limit
+            self.conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.conn.execute('''
+                DELETE FROM ai_cache WHERE key IN (
+                    SELECT key FROM ai_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM ai_cache")
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "hit_rate": (self.hits / total) if total else 0.0}
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+class GeminiBackend:
+    """Live Gemini model handle. Built once and kept warm inside the shared engine."""
+    def __init__(self, model_name):
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = self.model.model_name
+
+    def generate(self, prompt, config=None, timeout=None):
+        request_options = {"timeout": timeout} if timeout else None
+        return self.model.generate_content(prompt, generation_config=config, request_options=request_options)
+
+class FakeBackend:
+    """Offline stand-in for benchmarks and exercising the pages' AI paths without quota.
+    Returns canned text (or a JSON object covering every key the pages read) after an optional delay."""
+    def __init__(self, model_name="fake-model", latency=0.0, responder=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.responder = responder
+
+    def generate(self, prompt, config=None, timeout=None):
+        if self.latency: time.sleep(self.latency)
+        if self.responder: return CachedResponse(self.responder(prompt, config))
+        if config and config.get("response_mime_type") == "application/json":
+            return CachedResponse(json.dumps({
+                "subject": "[FAKE] Follow-up", "body": "Offline draft generated by FakeBackend.",
+                "Situation": "Found - fake", "Task": "Found - fake", "Action": "Found - fake", "Result": "Found - fake", "Verdict": "Pass",
+                "education_section": "", "experience_section": "", "leadership_section": "", "additional_section": ""
+            }))
+        return CachedResponse(f"[{self.model_name}] Offline response ({len(str(prompt))} prompt chars).")
+
 class AIEngine:
-    def __init__(self):
-        try:
-            genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        except Exception:
-            st.error("MISSING API KEY: Add GOOGLE_API_KEY to secrets.toml")
-        self.primary_model = genai.GenerativeModel("gemini-2.5-flash")
-        self.fallback_model = genai.GenerativeModel("gemini-2.5-flash-lite")
+    # After a quota error the primary model is skipped for this long (shared across all sessions)
+    PRIMARY_COOLDOWN_SECONDS = 60
 
-    def generate_content(self, prompt, config=None):
-        try:
-            return self.primary_model.generate_content(prompt, generation_config=config)
-        except exceptions.ResourceExhausted:
+    def __init__(self, primary=None, fallback=None, cache=None):
+        if primary is None or fallback is None:
             try:
-                return self.fallback_model.generate_content(prompt, generation_config=config)
+                genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
+            except Exception:
+                st.error("MISSING API KEY: Add GOOGLE_API_KEY to secrets.toml")
+        self.primary_model = primary or GeminiBackend("gemini-2.5-flash")
+        self.fallback_model = fallback or GeminiBackend("gemini-2.5-flash-lite")
+        self.cache = cache if cache is not None else get_response_cache()
+        self.state_lock = threading.Lock()
+        self.primary_cooldown_until = 0.0
+        self.call_stats = {"primary": 0, "fallback": 0, "quota_errors": 0}
+
+    def generate_content(self, prompt, config=None, use_cache=True, timeout=None):
+        """use_cache=False bypasses the lookup (forces a fresh call) but still refreshes the stored answer."""
+        keys = [ResponseCache.make_key(m.model_name, prompt, config) for m in (self.primary_model, self.fallback_model)]
+        if use_cache:
+            cached_text = self.cache.lookup(keys)
+            if cached_text is not None:
+                return CachedResponse(cached_text)
+
+        # Primary recently hit its quota: go straight to the fallback instead of burning a failed call
+        if time.time() >= self.primary_cooldown_until:
+            try:
+                response = self.primary_model.generate(prompt, config, timeout)
+                self._record("primary")
+                self._store(keys[0], self.primary_model, response)
+                return response
             except exceptions.ResourceExhausted:
-                st.error("TOKEN LIMIT REACHED.")
-                raise
-        except Exception as e:
-            raise e
+                with self.state_lock:
+                    self.call_stats["quota_errors"] += 1
+                    self.primary_cooldown_until = time.time() + self.PRIMARY_COOLDOWN_SECONDS
+        try:
+            response = self.fallback_model.generate(prompt, config, timeout)
+            self._record("fallback")
+            self._store(keys[1], self.fallback_model, response)
+            return response
+        except exceptions.ResourceExhausted:
+            # No st.* here: this also runs on job / pool threads; callers surface the error (page try/except, job_panel)
+            with self.state_lock: self.call_stats["quota_errors"] += 1
+            raise
+
+    def _record(self, model_slot):
+        with self.state_lock: self.call_stats[model_slot] += 1
+
+    def _store(self, key, model, response):
+        # Blocked / empty candidates raise on .text - never cache those
+        try: text = response.text
+        except Exception: return
+        if text: self.cache.store(key, model.model_name, text)
+
+    def generate_many(self, prompts, config=None, concurrency=4, timeout=60, use_cache=True):
+        """Runs prompts concurrently on a thread pool. Results come back in input order;
+        a failed or timed-out prompt yields its Exception in that slot instead of a response."""
+        prompts = list(prompts)
+        if not prompts: return []
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(prompts)))) as pool:
+            futures = [pool.submit(self.generate_content, p, config, use_cache, timeout) for p in prompts]
+            results = []
+            for future in futures:
+                try: results.append(future.result())
+                except Exception as e: results.append(e)
+        return results
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def engine_stats(self):
+        with self.state_lock:
+            return dict(self.call_stats, primary_cooling_down=time.time() < self.primary_cooldown_until)
+
+@st.cache_resource
+def get_ai_engine():
+    """One engine per process, shared across Streamlit sessions (like get_db_connection).
+    Set MENTOROS_AI_BACKEND=fake (or AI_BACKEND = "fake" in secrets.toml) to run offline."""
+    backend = os.environ.get("MENTOROS_AI_BACKEND")
+    if not backend:
+        try: backend = st.secrets.get("AI_BACKEND", "gemini")
+        except Exception: backend = "gemini"
+    if backend == "fake":
+        latency = float(os.environ.get("MENTOROS_FAKE_LATENCY", "0"))
+        return AIEngine(primary=FakeBackend("fake-primary", latency), fallback=FakeBackend("fake-fallback", latency))
+    return AIEngine()
 
+# =========================================================
+# DATABASE: per-thread readers + one serialized writer (see db_engine)
+# =========================================================
 @st.cache_resource
+def get_database():
+    return db_engine.Database(DB_PATH, setup=_create_schema)
+
 def get_db_connection():
-    # check_same_thread=False is needed for Streamlit's threading model
-    conn = sqlite3.connect('wso_mentor_os.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """This thread's read-only connection (WAL, so reads never wait on the writer).
+    Writes go through run_write()."""
+    return get_database().reader()
 
-def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def run_write(fn):
+    """Runs fn(conn) on the writer thread in a batched transaction; returns fn's result once committed.
+    fn must not commit. Helpers below take `conn=` so they can be composed inside one job."""
+    return get_database().write(fn)
+
+def submit_write(fn):
+    """Non-blocking run_write: returns a Future, so the page can keep drawing progress meanwhile."""
+    return get_database().submit(fn)
+
+def _create_schema(conn):
     # Main Client Table with all feature columns
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS clients (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             student TEXT NOT NULL,
@@ -76,88 +278,411 @@ def init_db():
     ''')
     
     # Global Knowledge Vault
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS global_kb (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             filename TEXT,
             content TEXT
         )
     ''')
-    conn.commit()
+
+    # Session History (one row per logged session; replaces the pipe-delimited clients.history blob)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS session_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            event_type TEXT,
+            scores TEXT,
+            notes TEXT,
+            ai_context TEXT
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_session_events_client_ts ON session_events (client_id, created_at)")
+
+    # Mock interview scores (one typed row per mock; replaces the clients.mock_data JSON list)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS mock_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            mock_date TEXT,
+            tech REAL,
+            beh REAL,
+            notes TEXT
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mock_scores_client_date ON mock_scores (client_id, mock_date)")
 
     # Self-healing: Add columns if they don't exist (for existing DBs)
-    try: cursor.execute("ALTER TABLE clients ADD COLUMN session_date TEXT")
+    try: conn.execute("ALTER TABLE clients ADD COLUMN session_date TEXT")
+    except: pass
+    try: conn.execute("ALTER TABLE clients ADD COLUMN reminder_freq TEXT DEFAULT 'None'")
     except: pass
-    try: cursor.execute("ALTER TABLE clients ADD COLUMN reminder_freq TEXT DEFAULT 'None'")
+    try: conn.execute("ALTER TABLE clients ADD COLUMN history_migrated INTEGER DEFAULT 0")
     except: pass
+    try: conn.execute("ALTER TABLE clients ADD COLUMN row_version INTEGER DEFAULT 0")
+    except: pass
+    try: conn.execute("ALTER TABLE clients ADD COLUMN import_key TEXT")
+    except: pass
+    try: conn.execute("ALTER TABLE clients ADD COLUMN mocks_migrated INTEGER DEFAULT 0")
+    except: pass
+
+    # Change tracking for the shared client cache: every write to clients (from any page or
+    # connection) bumps data_version['clients'] and stamps the row; deletes leave a tombstone.
+    # (one statement per execute: executescript would COMMIT the writer's open transaction)
+    conn.execute("CREATE TABLE IF NOT EXISTS data_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('clients', 0)")
+    conn.execute("CREATE TABLE IF NOT EXISTS client_deletions (client_id INTEGER NOT NULL, version INTEGER NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_client_deletions_version ON client_deletions (version)")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS clients_version_ai AFTER INSERT ON clients BEGIN
+            UPDATE data_version SET version = version + 1 WHERE name = 'clients';
+            UPDATE clients SET row_version = (SELECT version FROM data_version WHERE name = 'clients') WHERE id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS clients_version_au AFTER UPDATE ON clients WHEN new.row_version IS old.row_version BEGIN
+            UPDATE data_version SET version = version + 1 WHERE name = 'clients';
+            UPDATE clients SET row_version = (SELECT version FROM data_version WHERE name = 'clients') WHERE id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS clients_version_ad AFTER DELETE ON clients BEGIN
+            UPDATE data_version SET version = version + 1 WHERE name = 'clients';
+            INSERT INTO client_deletions (client_id, version) SELECT old.id, version FROM data_version WHERE name = 'clients';
+        END
+    ''')
 
-    # Load initial state
-    if 'client_db' not in st.session_state:
-        cursor.execute("SELECT * FROM clients")
-        st.session_state['client_db'] = [dict(row) for row in cursor.fetchall()]
-        # Parse JSON fields
-        for client in st.session_state['client_db']:
-            for key in ['stories_log', 'mock_data', 'latest_resume_json']:
-                if client.get(key):
-                    try: client[key] = json.loads(client[key])
-                    except: client[key] = {} if 'log' in key or 'json' in key else []
+    # Lookup indexes (name search, calendar ranges)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clients_student ON clients (student)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clients_session_date ON clients (session_date)")
+    # Stable identity for CSV re-imports (upsert target); NULL for clients created via intake
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_import_key ON clients (import_key) WHERE import_key IS NOT NULL")
+
+    # Stored compliance audits (one per client), keyed by a hash of the audited resume text
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resume_audits (
+            client_id INTEGER PRIMARY KEY,
+            audit_key TEXT NOT NULL,
+            score INTEGER,
+            issue_count INTEGER,
+            issues TEXT,
+            bullet_hashes TEXT,
+            audited_at TEXT
+        )
+    """)
+    try: conn.execute("ALTER TABLE resume_audits ADD COLUMN bullet_hashes TEXT")
+    except: pass
+
+    # Pre-aggregated dashboard tables, kept current by triggers on clients / session_events
+    analytics_engine.ensure_store(conn)
+
+    # Background job queue (see job_engine)
+    job_engine.ensure_schema(conn)
+
+def init_db():
+    # Schema + self-healing columns run once per process when the Database is built
+    get_database()
+    migrate_history_blobs()
+    migrate_mock_blobs()
+
+    # Chunk + vector index over the vault and client overlays (reconciled once per process)
+    ensure_vault_index()
 
     if 'global_kb' not in st.session_state:
-        cursor.execute("SELECT * FROM global_kb")
-        st.session_state['global_kb'] = [dict(row) for row in cursor.fetchall()]
-
-def create_pdf_report(student, tech_score, beh_score, feedback, agenda):
-    """Generates a branded WSO PDF report card."""
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    # Header
-    c.setLineWidth(2)
-    c.line(50, height - 50, width - 50, height - 50)
-    c.setFont("Times-Bold", 24)
-    c.drawString(50, height - 40, "WSO ACADEMY | PERFORMANCE CARD")
-    
-    # Metadata
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, height - 80, f"CANDIDATE: {student}")
-    c.drawString(50, height - 100, f"DATE: {datetime.date.today().strftime('%B %d, %Y')}")
-    
-    # Scores
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, height - 140, "SESSION SCORES:")
-    c.setFillColor(colors.black)
-    c.rect(50, height - 190, 200, 40, stroke=1, fill=0)
-    c.setFont("Helvetica", 12)
-    c.drawString(60, height - 165, f"TECHNICAL: {tech_score}/10")
-    c.drawString(60, height - 180, f"BEHAVIORAL: {beh_score}/10")
-    
-    # Verdict
-    overall = (tech_score + beh_score) / 2
-    verdict = "STRONG HIRE" if overall >= 8 else "NEEDS POLISH"
-    c.drawString(300, height - 170, f"VERDICT: {verdict}")
-
-    # Feedback
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, height - 230, "MENTOR FEEDBACK & NOTES:")
-    c.setFont("Helvetica", 10)
-    
-    text_obj = c.beginText(50, height - 250)
-    text_obj.setFont("Helvetica", 10)
-    
-    # Simple Text Wrapping
-    feedback_lines = feedback.split('\n')
-    for line in feedback_lines:
-        # Basic truncation to prevent overflow
-        chunk_size = 90
-        for i in range(0, len(line), chunk_size):
-            text_obj.textLine(line[i:i+chunk_size])
-    
-    c.drawText(text_obj)
-    
-    # Footer
-    c.setFont("Times-Italic", 10)
-    c.drawString(50, 50, "Wall Street Oasis Mentor OS - Confidential")
-    c.save()
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+        refresh_global_kb()
+
+# =========================================================
+# CLIENT REPOSITORY (everything keyed by clients.id)
+# =========================================================
+# Nothing is held per session. Reads go through one process-wide ClientCache shared by every
+# browser session: the light projection of every client plus an LRU of full (heavy) rows.
+# It re-syncs from data_version on each read, pulling only rows stamped after the last version seen.
+CLIENT_SUMMARY_COLUMNS = "id, student, session_date, time, type"
+CLIENT_JSON_FIELDS = {'stories_log': dict, 'mock_data': list, 'latest_resume_json': dict}
+CLIENT_ROW_CACHE_MAX_ENTRIES = 256
+
+def _parse_client_row(row):
+    client = dict(row)
+    for key, empty in CLIENT_JSON_FIELDS.items():
+        if client.get(key):
+            try: client[key] = json.loads(client[key])
+            except: client[key] = empty()
+    return client
+
+class ClientCache:
+    """Shared read cache for clients, invalidated by the trigger-maintained data_version row.
+
+    (PRAGMA data_version is per connection and moves on every commit the writer makes, jobs and
+    vault chunks included, so the per-thread readers would all rebuild constantly; the trigger-kept
+    row only moves when clients change.)
+    """
+    def __init__(self, max_rows=CLIENT_ROW_CACHE_MAX_ENTRIES):
+        self.lock = threading.Lock()
+        self.version = -1
+        self.summaries = {}
+        self.rows = OrderedDict()
+        self.max_rows = max_rows
+
+    def sync(self, conn):
+        """Applies inserts/updates/deletes committed since the last sync. One tiny read when nothing changed.
+        Returns True if it applied tombstones (which can then be pruned)."""
+        current = conn.execute("SELECT version FROM data_version WHERE name = 'clients'").fetchone()[0]
+        with self.lock:
+            if current == self.version: return False
+            changed = conn.execute(f"SELECT {CLIENT_SUMMARY_COLUMNS} FROM clients WHERE row_version > ?", (self.version,)).fetchall()
+            deleted = conn.execute("SELECT client_id FROM client_deletions WHERE version > ?", (self.version,)).fetchall()
+            for row in changed:
+                self.summaries[row['id']] = dict(row)
+                self.rows.pop(row['id'], None)
+            for row in deleted:
+                self.summaries.pop(row['client_id'], None)
+                self.rows.pop(row['client_id'], None)
+            if self.version < 0: self.summaries = dict(sorted(self.summaries.items()))
+            self.version = current
+            return bool(deleted)
+
+    def summary_list(self):
+        with self.lock: return list(self.summaries.values())
+
+    def get_row(self, conn, client_id):
+        with self.lock:
+            if client_id in self.rows:
+                self.rows.move_to_end(client_id)
+                return copy.deepcopy(self.rows[client_id])
+        row = conn.execute("SELECT * FROM clients WHERE id = ?", (client_id,)).fetchone()
+        if row is None: return None
+        client = _parse_client_row(row)
+        with self.lock:
+            self.rows[client_id] = client
+            while len(self.rows) > self.max_rows: self.rows.popitem(last=False)
+        return copy.deepcopy(client)
+
+@st.cache_resource
+def get_client_cache():
+    return ClientCache()
+
+def _synced_client_cache():
+    cache = get_client_cache()
+    if cache.sync(get_db_connection()):
+        # This cache is the only reader of the tombstones: once applied (or skipped by a fresh build) they can go
+        version = cache.version
+        submit_write(lambda conn: conn.execute("DELETE FROM client_deletions WHERE version <= ?", (version,)))
+    return cache
+
+def count_clients():
+    return len(_synced_client_cache().summaries)
+
+def list_clients(limit=None, offset=0):
+    """Summary dicts (id, student, session_date, time, type) in intake order, one page at a time."""
+    summaries = _synced_client_cache().summary_list()
+    end = None if limit is None else offset + limit
+    return [dict(c) for c in summaries[offset:end]]
+
+def list_clients_between(start_date, end_date):
+    """Summaries with session_date in [start_date, end_date] ('YYYY-MM-DD'), ordered by date and time.
+    Goes straight to the session_date index rather than scanning the cached client list."""
+    return calendar_engine.sessions_between(get_db_connection(), start_date, end_date)
+
+def client_choices():
+    """{id: selectbox label} for every client; a name shared by several clients gets a '#id' suffix."""
+    summaries = _synced_client_cache().summary_list()
+    name_counts = Counter(c['student'] for c in summaries)
+    return {c['id']: f"{c['student']} (#{c['id']})" if name_counts[c['student']] > 1 else c['student'] for c in summaries}
+
+def count_pending_drafts():
+    return get_db_connection().execute("SELECT COUNT(*) FROM clients WHERE type = 'Resume Review (Full)' AND latest_resume_json IS NULL").fetchone()[0]
+
+def audit_resume_book():
+    """Runs the compliance audit over every client resume that changed since its stored audit
+    (identical texts are audited once). Returns {'audited': n, 'skipped': n}."""
+    stale, total = resume_engine.stale_resumes(get_db_connection())
+    unique = {key: text for _, key, text in stale}
+    results = dict(zip(unique, resume_engine.audit_many(unique.values())))
+    run_write(lambda conn: resume_engine.store_audits(conn, [(client_id, key, results[key]) for client_id, key, _ in stale]))
+    return {"audited": len(stale), "skipped": total - len(stale)}
+
+def analytics_snapshot():
+    """{'type_mix', 'mock_series', 'throughput', 'trends'} frames from the pre-aggregated store; re-read only after a change."""
+    return analytics_engine.get_analytics_cache().snapshot(get_db_connection())
+
+def resume_leaderboard():
+    return resume_engine.leaderboard(get_db_connection())
+
+def get_resume_audit(client_id):
+    return resume_engine.get_audit(get_db_connection(), client_id)
+
+def save_resume_audit(client_id, text, result):
+    """Stores a single-client audit result (e.g. from run_incremental_audit) as the new baseline."""
+    run_write(lambda conn: resume_engine.store_audits(conn, [(client_id, resume_engine.audit_key(text), result)]))
+
+def get_client(client_id, conn=None):
+    """Full client row by id with JSON fields parsed (None if unknown). Served from the shared cache
+    while the row is unchanged; the caller gets its own copy."""
+    if client_id is None: return None
+    return _synced_client_cache().get_row(conn or get_db_connection(), client_id)
+
+def _write(conn, job):
+    # Inside a write job: run on its connection. Otherwise: queue as a job of its own.
+    return job(conn) if conn is not None else run_write(job)
+
+def insert_client(conn=None, **fields):
+    """INSERTs a client row. Returns the new id."""
+    cols = list(fields)
+    values = [json.dumps(v) if k in CLIENT_JSON_FIELDS and not isinstance(v, str) else v for k, v in fields.items()]
+    return _write(conn, lambda c: c.execute(f"INSERT INTO clients ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", values).lastrowid)
+
+def update_client(client_id, conn=None, **fields):
+    """UPDATE ... WHERE id = ? for the given columns."""
+    if not fields: return
+    values = [json.dumps(v) if k in CLIENT_JSON_FIELDS and not isinstance(v, str) else v for k, v in fields.items()]
+    _write(conn, lambda c: c.execute(f"UPDATE clients SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?", values + [client_id]))
+
+def delete_client(client_id, conn=None):
+    def job(c):
+        c.execute("DELETE FROM session_events WHERE client_id = ?", (client_id,))
+        c.execute("DELETE FROM mock_scores WHERE client_id = ?", (client_id,))
+        c.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+        c.execute("DELETE FROM resume_audits WHERE client_id = ?", (client_id,))
+        vault_engine.remove_document(c, 'client', client_id)
+    _write(conn, job)
+
+@st.cache_resource
+def migrate_history_blobs():
+    """One-time (per process) move of legacy ' | '-delimited history blobs into session_events.
+    Legacy entries have no reliable year, so they keep an empty created_at and sort as oldest."""
+    def job(conn):
+        rows = conn.execute("SELECT id, history FROM clients WHERE history_migrated = 0 AND history IS NOT NULL AND history != ''").fetchall()
+        for row in rows:
+            entries = [h.strip() for h in row['history'].split('|') if h.strip()]
+            conn.executemany("INSERT INTO session_events (client_id, created_at, event_type, notes) VALUES (?, '', 'Legacy Log', ?)",
+                             [(row['id'], entry) for entry in entries])
+        conn.execute("UPDATE clients SET history_migrated = 1 WHERE history_migrated = 0")
+        return len(rows)
+    return run_write(job)
+
+@st.cache_resource
+def migrate_mock_blobs():
+    """One-time (per process) move of legacy clients.mock_data JSON lists into mock_scores, in list order.
+    Entries without numeric scores are skipped; the blob itself is left in place like history."""
+    def job(conn):
+        rows = conn.execute("SELECT id, mock_data FROM clients WHERE mocks_migrated = 0 AND mock_data IS NOT NULL AND mock_data NOT IN ('', '[]')").fetchall()
+        for row in rows:
+            try: mocks = json.loads(row['mock_data'])
+            except ValueError: continue
+            scores = []
+            for m in mocks if isinstance(mocks, list) else []:
+                try: scores.append((row['id'], m.get('date'), float(m['tech']), float(m['beh']), m.get('notes')))
+                except (AttributeError, KeyError, TypeError, ValueError): continue
+            conn.executemany("INSERT INTO mock_scores (client_id, mock_date, tech, beh, notes) VALUES (?, ?, ?, ?, ?)", scores)
+        conn.execute("UPDATE clients SET mocks_migrated = 1 WHERE mocks_migrated = 0")
+        return len(rows)
+    return run_write(job)
+
+def add_mock_score(client_id, tech, beh, notes="", mock_date=None, conn=None):
+    """Appends one mock interview result (a single INSERT, no read-modify-write of the client row)."""
+    params = (client_id, mock_date or datetime.date.today().isoformat(), tech, beh, notes)
+    _write(conn, lambda c: c.execute("INSERT INTO mock_scores (client_id, mock_date, tech, beh, notes) VALUES (?, ?, ?, ?, ?)", params))
+
+def get_mock_scores(client_id):
+    """A client's mocks, oldest first."""
+    rows = get_db_connection().execute("SELECT mock_date, tech, beh, notes FROM mock_scores WHERE client_id = ? ORDER BY id", (client_id,)).fetchall()
+    return [dict(row) for row in rows]
+
+def log_session_event(client_id, event_type, notes="", scores=None, ai_context="", conn=None):
+    """Appends one history event for a client (O(1): a single INSERT, no read-modify-write)."""
+    params = (client_id, datetime.datetime.now().isoformat(timespec="seconds"), event_type, json.dumps(scores) if scores else None, notes, ai_context)
+    _write(conn, lambda c: c.execute("INSERT INTO session_events (client_id, created_at, event_type, scores, notes, ai_context) VALUES (?, ?, ?, ?, ?, ?)", params))
+
+def get_session_events(client_id, limit=10, offset=0):
+    """Newest-first page of a client's history, served by the (client_id, created_at) index."""
+    rows = get_db_connection().execute('''
+        SELECT id, created_at, event_type, scores, notes, ai_context FROM session_events
+        WHERE client_id = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+    ''', (client_id, limit, offset)).fetchall()
+    events = [dict(r) for r in rows]
+    for e in events:
+        e['scores'] = json.loads(e['scores']) if e['scores'] else {}
+    return events
+
+def count_session_events(client_id):
+    return get_db_connection().execute("SELECT COUNT(*) FROM session_events WHERE client_id = ?", (client_id,)).fetchone()[0]
+
+def format_session_event(event):
+    """One-line label for an event, e.g. '2026-10-18 Mock Interview (tech 7, beh 6)'."""
+    if event['event_type'] == 'Legacy Log': return event['notes'] or ""
+    score_str = ", ".join(f"{k} {v}" for k, v in event['scores'].items())
+    label = f"{event['created_at'][:10]} {event['event_type']}"
+    return f"{label} ({score_str})" if score_str else label
+
+@st.cache_resource
+def ensure_vault_index():
+    run_write(vault_engine.ensure_index)
+    return True
+
+def refresh_global_kb():
+    """Vault listing for the UI only. Document bodies stay in SQLite; prompts pull chunks from the index."""
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT id, filename, substr(content, 1, 1000) AS preview FROM global_kb")
+    st.session_state['global_kb'] = [dict(row) for row in cursor.fetchall()]
+
+# =========================================================
+# BACKGROUND JOBS: slow AI / document work off the script thread (see job_engine)
+# =========================================================
+# Pages submit with a key built from the job's inputs, so a double click, a rerun or a second tab
+# gets the same job id back instead of a second run. The id lives in session_state; job_panel()
+# polls it and hands the result back to the page when it is done.
+@job_engine.handler("agenda", retry_on=(exceptions.ResourceExhausted,))
+def _agenda_job(payload):
+    return get_ai_engine().generate_content(payload['prompt'], use_cache=not payload.get('fresh')).text
+
+def _save_redraft(conn, payload, data):
+    # Completion step: runs only if the job is still live when it finishes, so a cancelled redraft never lands
+    update_client(payload['client_id'], conn=conn, latest_resume_json=data)
+
+@job_engine.handler("resume_redraft", retry_on=(exceptions.ResourceExhausted,), on_done=_save_redraft)
+def _resume_redraft_job(payload):
+    return json.loads(get_ai_engine().generate_content(payload['prompt'], config={"response_mime_type": "application/json"}).text)
+
+# CPU-bound: runs on the shared process pool, like report_engine.render_many
+job_engine.handler("report_card", pool="process")(report_engine.render_report)
+
+@st.cache_resource
+def get_job_queue():
+    return job_engine.JobQueue(get_database())
+
+def job_key(kind, *parts):
+    """Dedupe key for a job: its kind plus a digest of everything that determines its output."""
+    return f"{kind}:{hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]}"
+
+def start_job(state_key, kind, payload, key=None, reuse_done=True):
+    """Queues a job and remembers its id under st.session_state[state_key] for job_panel()."""
+    st.session_state[state_key] = get_job_queue().submit(kind, payload, key=key, reuse_done=reuse_done)
+    st.session_state.pop(f"{state_key}_error", None)
+
+def job_panel(state_key, on_done, label="Working..."):
+    """Status line + cancel button for the job in st.session_state[state_key]. When it finishes,
+    on_done(result) runs once and the page reruns; failures are shown as st.error."""
+    error = st.session_state.pop(f"{state_key}_error", None)
+    if error: st.error(f"Job failed: {error}")
+    if st.session_state.get(state_key) is not None: _job_status(state_key, on_done, label)
+
+@st.fragment(run_every=1)
+def _job_status(state_key, on_done, label):
+    job_id = st.session_state.get(state_key)
+    if job_id is None: return
+    queue = get_job_queue()
+    job = queue.poll(job_id)
+    if job is None or job['status'] in job_engine.FINISHED:
+        st.session_state.pop(state_key)
+        if job is not None and job['status'] == "done": on_done(queue.result(job_id))
+        elif job is not None and job['status'] == "failed": st.session_state[f"{state_key}_error"] = job['error']
+        st.rerun()
+    c_status, c_cancel = st.columns([4, 1])
+    waiting = job['status'] == "queued" and job['attempts'] > 0
+    note = f" — retrying in {max(0, job['run_after'] - time.time()):.0f}s ({job['error']})" if waiting else ""
+    c_status.info(f"⏳ {label} {job['status'].upper()} (attempt {max(job['attempts'], 1)}/{job['max_attempts']}){note}")
+    if c_cancel.button("✖ CANCEL", key=f"{state_key}_cancel", use_container_width=True):
+        queue.cancel(job_id)
+        st.session_state.pop(state_key)
+        st.rerun()
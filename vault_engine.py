@@ -0,0 +1,211 @@
+import os
+import re
+import hashlib
+from collections import Counter
+import db_engine
+
+# ~4 characters per token is close enough for Gemini budgeting
+CHARS_PER_TOKEN = 4
+CHUNK_WORDS = 180
+CHUNK_OVERLAP = 30
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are", "was", "were", "be", "been",
+    "it", "its", "this", "that", "as", "at", "by", "from", "you", "your", "we", "our", "they", "their", "i", "my",
+    "me", "he", "she", "his", "her", "but", "not", "if", "so", "do", "does", "did", "have", "has", "had", "will",
+    "would", "can", "could", "should", "what", "which", "who", "how", "why", "when", "there", "then", "than", "into",
+    "about", "also", "more", "most", "such", "any", "all", "each", "other", "some", "no", "yes", "up", "out"
+}
+
+# Expands the session-prep topic pickers into the vocabulary the vault documents actually use
+TOPIC_KEYWORDS = {
+    "Accounting": ["accounting", "income", "statement", "balance", "sheet", "cash", "flow", "depreciation", "working", "capital", "revenue", "ebitda"],
+    "Valuation": ["valuation", "multiples", "comps", "comparable", "precedent", "transactions", "ev", "enterprise", "equity", "value"],
+    "DCF": ["dcf", "discounted", "cash", "flow", "wacc", "terminal", "value", "growth", "unlevered", "fcf", "discount", "rate"],
+    "LBO": ["lbo", "leveraged", "buyout", "irr", "debt", "sponsor", "exit", "multiple", "leverage", "returns"],
+    "M&A": ["merger", "acquisition", "m&a", "accretion", "dilution", "synergies", "purchase", "premium", "goodwill"],
+    "Markets": ["market", "markets", "rates", "yield", "inflation", "fed", "equities", "bonds", "spread"],
+    "RX": ["restructuring", "rx", "distressed", "bankruptcy", "chapter", "covenant", "creditors", "recovery"],
+    "TMAY": ["tmay", "tell", "yourself", "background", "story", "walk", "resume"],
+    "Why IB/PE?": ["why", "banking", "ib", "private", "equity", "pe", "career", "motivation"],
+    "Conflict/Teamwork": ["conflict", "team", "teamwork", "disagreement", "colleague", "resolve"],
+    "Strengths/Weaknesses": ["strength", "strengths", "weakness", "weaknesses", "improve", "feedback"],
+    "Market View": ["market", "view", "trend", "deal", "pitch", "stock", "sector"],
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9&]+")
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Splits text into overlapping word windows."""
+    words = (text or "").split()
+    if not words: return []
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, max(1, len(words) - overlap), step)]
+
+def content_hash(content):
+    return hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+
+def build_query_terms(topics, dossier_text="", extra_text="", dossier_terms=25):
+    """Weighted query: selected topics (expanded) count most, then salient dossier vocabulary."""
+    weights = Counter()
+    for topic in topics or []:
+        for term in TOPIC_KEYWORDS.get(topic, tokenize(topic)):
+            weights[term] = max(weights[term], 2.0)
+    for term in tokenize(extra_text):
+        weights[term] = max(weights[term], 1.5)
+    for term, _ in Counter(tokenize(dossier_text)).most_common(dossier_terms):
+        weights[term] = max(weights[term], 0.5)
+    return weights
+
+# =========================================================
+# PERSISTENT CHUNK INDEX (SQLite FTS5, BM25 ranking)
+# =========================================================
+# source = 'global' (doc_id = global_kb.id) or 'client' (doc_id = clients.id, the session_kb_text overlay)
+# The write functions run inside a writer job (utils.run_write) and never commit: the writer owns the transaction.
+
+# Optional embedding index (vector_engine) kept in step with kb_chunks. MENTOROS_VECTOR_INDEX=0 turns it off.
+# Its files aren't part of the transaction, so changes are applied through db_engine.after_commit: a
+# rolled-back job leaves no vectors behind for chunk ids that SQLite will hand out again.
+VECTOR_INDEX_ENABLED = os.environ.get("MENTOROS_VECTOR_INDEX", "1") != "0"
+
+def _vector_index():
+    # Imported lazily: vector_engine builds on this module's tokenizer
+    import vector_engine
+    return vector_engine.get_vector_index() if VECTOR_INDEX_ENABLED else None
+
+def ensure_index(conn):
+    """Creates the index tables and reconciles them with global_kb / clients (backfills existing DBs)."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kb_chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT,
+            doc_id INTEGER,
+            filename TEXT,
+            chunk TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_kb_chunks_doc ON kb_chunks (source, doc_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kb_index_docs (
+            source TEXT,
+            doc_id INTEGER,
+            content_hash TEXT,
+            PRIMARY KEY (source, doc_id)
+        )
+    """)
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS kb_chunks_fts USING fts5(chunk, content='kb_chunks', content_rowid='id', tokenize='porter unicode61')")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS kb_chunks_ai AFTER INSERT ON kb_chunks BEGIN INSERT INTO kb_chunks_fts(rowid, chunk) VALUES (new.id, new.chunk); END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS kb_chunks_ad AFTER DELETE ON kb_chunks BEGIN INSERT INTO kb_chunks_fts(kb_chunks_fts, rowid, chunk) VALUES ('delete', old.id, old.chunk); END")
+
+    # Reconcile: index anything unindexed, drop anything whose source row is gone
+    for row in cursor.execute("SELECT id, filename, content FROM global_kb WHERE id NOT IN (SELECT doc_id FROM kb_index_docs WHERE source = 'global')").fetchall():
+        index_document(conn, 'global', row[0], row[1], row[2])
+    for row in cursor.execute("SELECT doc_id FROM kb_index_docs WHERE source = 'global' AND doc_id NOT IN (SELECT id FROM global_kb)").fetchall():
+        remove_document(conn, 'global', row[0])
+    for row in cursor.execute("SELECT id, student, session_kb_text FROM clients WHERE session_kb_text IS NOT NULL AND session_kb_text != '' AND id NOT IN (SELECT doc_id FROM kb_index_docs WHERE source = 'client')").fetchall():
+        index_document(conn, 'client', row[0], row[1], row[2])
+    for row in cursor.execute("SELECT doc_id FROM kb_index_docs WHERE source = 'client' AND doc_id NOT IN (SELECT id FROM clients)").fetchall():
+        remove_document(conn, 'client', row[0])
+
+    vectors = _vector_index()
+    if vectors is not None:
+        # Registered last, so it compares against kb_chunks after this job's own vector changes are applied
+        db_engine.after_commit(conn, lambda: _reconcile_vectors(conn, vectors))
+
+def _reconcile_vectors(conn, vectors):
+    chunk_ids = {row[0] for row in conn.execute("SELECT id FROM kb_chunks").fetchall()}
+    indexed = vectors.indexed_ids()
+    vectors.remove(list(indexed - chunk_ids))
+    missing = sorted(chunk_ids - indexed)
+    for start in range(0, len(missing), 500):
+        batch = missing[start:start + 500]
+        rows = conn.execute(f"SELECT id, chunk FROM kb_chunks WHERE id IN ({','.join('?' * len(batch))})", batch).fetchall()
+        vectors.add([r[0] for r in rows], [r[1] for r in rows])
+
+def index_document(conn, source, doc_id, filename, content):
+    """(Re)indexes one document. No-op when its content hash is unchanged."""
+    digest = content_hash(content)
+    row = conn.execute("SELECT content_hash FROM kb_index_docs WHERE source = ? AND doc_id = ?", (source, doc_id)).fetchone()
+    if row and row[0] == digest: return
+    _drop_chunks(conn, "source = ? AND doc_id = ?", (source, doc_id))
+    conn.executemany("INSERT INTO kb_chunks (source, doc_id, filename, chunk) VALUES (?, ?, ?, ?)",
+                     [(source, doc_id, filename, chunk) for chunk in chunk_text(content)])
+    conn.execute("INSERT OR REPLACE INTO kb_index_docs (source, doc_id, content_hash) VALUES (?, ?, ?)", (source, doc_id, digest))
+    vectors = _vector_index()
+    if vectors is not None:
+        rows = conn.execute("SELECT id, chunk FROM kb_chunks WHERE source = ? AND doc_id = ?", (source, doc_id)).fetchall()
+        db_engine.after_commit(conn, lambda: vectors.add([r[0] for r in rows], [r[1] for r in rows]))
+
+def remove_document(conn, source, doc_id):
+    _drop_chunks(conn, "source = ? AND doc_id = ?", (source, doc_id))
+    conn.execute("DELETE FROM kb_index_docs WHERE source = ? AND doc_id = ?", (source, doc_id))
+
+def clear_source(conn, source):
+    _drop_chunks(conn, "source = ?", (source,))
+    conn.execute("DELETE FROM kb_index_docs WHERE source = ?", (source,))
+
+def _drop_chunks(conn, where, params):
+    vectors = _vector_index()
+    if vectors is not None:
+        ids = [r[0] for r in conn.execute(f"SELECT id FROM kb_chunks WHERE {where}", params).fetchall()]
+        db_engine.after_commit(conn, lambda: vectors.remove(ids))
+    conn.execute(f"DELETE FROM kb_chunks WHERE {where}", params)
+
+def to_match_query(query):
+    """Builds an FTS5 OR-query from free text or a {term: weight} dict.
+    FTS5's bm25() sums over query phrases, so repeating a term is how it gets weighted."""
+    weights = query if isinstance(query, dict) else Counter({t: 1.0 for t in tokenize(query)})
+    phrases = []
+    for term, weight in weights.items():
+        phrases.extend([f'"{term}"'] * max(1, round(weight * 2)))
+    return " OR ".join(phrases)
+
+def search(conn, query, k=10, source=None, doc_id=None):
+    """Top-k passages by BM25. query is free text or a {term: weight} dict (see build_query_terms)."""
+    match = to_match_query(query)
+    if not match: return []
+    sql = """
+        SELECT c.source, c.doc_id, c.filename, c.chunk, bm25(kb_chunks_fts) AS score
+        FROM kb_chunks_fts JOIN kb_chunks c ON c.id = kb_chunks_fts.rowid
+        WHERE kb_chunks_fts MATCH ?
+    """
+    params = [match]
+    if source is not None: sql += " AND c.source = ?"; params.append(source)
+    if doc_id is not None: sql += " AND c.doc_id = ?"; params.append(doc_id)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(k)
+    # bm25() is "lower is better"; flip it so callers see higher = more relevant
+    return [{"source": r[0], "doc_id": r[1], "filename": r[2], "chunk": r[3], "score": -r[4]} for r in conn.execute(sql, params).fetchall()]
+
+def assemble_context(conn, query_weights, token_budget=4000, source='global', doc_id=None):
+    """Fills token_budget with the best-ranked indexed chunks for the query.
+    With no usable query it falls back to chunks in upload order.
+    Returns (context_text, stats) where stats reports chunks in scope/used and tokens spent."""
+    scope_sql, scope_params = "source = ?", [source]
+    if doc_id is not None: scope_sql += " AND doc_id = ?"; scope_params.append(doc_id)
+    total = conn.execute(f"SELECT COUNT(*) FROM kb_chunks WHERE {scope_sql}", scope_params).fetchone()[0]
+    # Enough candidates to fill the budget a few times over (a full chunk is roughly CHUNK_WORDS * 1.5 tokens)
+    k = max(10, 3 * token_budget // int(CHUNK_WORDS * 1.5))
+    hits = search(conn, query_weights, k=k, source=source, doc_id=doc_id) if query_weights else []
+    if not hits:
+        rows = conn.execute(f"SELECT filename, chunk FROM kb_chunks WHERE {scope_sql} ORDER BY id LIMIT ?", scope_params + [k]).fetchall()
+        hits = [{"filename": r[0], "chunk": r[1]} for r in rows]
+
+    picked, used_tokens = [], 0
+    for hit in hits:
+        cost = estimate_tokens(hit['chunk'])
+        if used_tokens + cost > token_budget: continue
+        picked.append(hit)
+        used_tokens += cost
+        if token_budget - used_tokens < CHUNK_WORDS: break
+
+    context = "\n\n".join(f"[{h['filename']}]\n{h['chunk']}" for h in picked)
+    stats = {"chunks_total": total, "chunks_used": len(picked), "tokens_used": used_tokens, "token_budget": token_budget}
+    return context, stats
@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import math
+import zlib
+import threading
+from collections import Counter
+import numpy as np
+import streamlit as st
+import vault_engine
+
+VECTOR_DIR = 'wso_vectors'
+VECTOR_DIM = 1024
+
+# Acronym <-> long form. Both spellings emit the acronym as an extra "concept" token,
+# so "DCF" and "discounted cash flow" land on the same feature.
+FINANCE_SYNONYMS = {
+    "dcf": ["discounted cash flow", "discounted cash flows"],
+    "lbo": ["leveraged buyout", "leveraged buy out", "leveraged buyouts"],
+    "m&a": ["mergers and acquisitions", "merger and acquisition", "mergers & acquisitions"],
+    "wacc": ["weighted average cost of capital"],
+    "irr": ["internal rate of return"],
+    "ev": ["enterprise value"],
+    "fcf": ["free cash flow", "free cash flows"],
+    "ufcf": ["unlevered free cash flow"],
+    "ebitda": ["earnings before interest taxes depreciation and amortization", "earnings before interest, taxes, depreciation and amortization"],
+    "pe": ["private equity"],
+    "ib": ["investment banking", "investment bank"],
+    "rx": ["restructuring"],
+    "capex": ["capital expenditures", "capital expenditure"],
+    "nwc": ["net working capital"],
+    "p&l": ["profit and loss", "income statement"],
+    "tmay": ["tell me about yourself"],
+    "ipo": ["initial public offering"],
+    "dcm": ["debt capital markets"],
+    "ecm": ["equity capital markets"],
+}
+_PHRASE_TO_CONCEPT = {p: concept for concept, phrases in FINANCE_SYNONYMS.items() for p in phrases}
+# One alternation (longest phrases first) so each text is scanned once
+_PHRASE_RE = re.compile(r"\b(" + "|".join(re.escape(p) for p in sorted(_PHRASE_TO_CONCEPT, key=len, reverse=True)) + r")\b")
+
+def featurize(text):
+    """Token counts for one text: vault tokens plus synonym concept tokens."""
+    lowered = (text or "").lower()
+    counts = Counter(vault_engine.tokenize(lowered))
+    for phrase in _PHRASE_RE.findall(lowered):
+        counts[_PHRASE_TO_CONCEPT[phrase]] += 1
+    return counts
+
+def embed(texts, dim=VECTOR_DIM):
+    """Hashed sublinear-TF vectors (float32, one row per text). IDF is applied at query time."""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for token, tf in featurize(text).items():
+            matrix[i, zlib.crc32(token.encode("utf-8")) % dim] += 1.0 + math.log(tf)
+    return matrix
+
+class VectorIndex:
+    """Append-only, memory-mapped matrix of chunk vectors keyed by kb_chunks.id.
+
+    Files in VECTOR_DIR: vectors.f32 (capacity x dim), chunk_ids.i64 (-1 = deleted row),
+    df.f64 (per-bucket document frequency) and meta.json (row count, live docs).
+    Rows are appended on upload and zeroed on delete, so the index is never rebuilt.
+    """
+    def __init__(self, path=VECTOR_DIR, dim=VECTOR_DIM):
+        self.path = path
+        self.dim = dim
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        meta = {"rows": 0, "docs": 0, "capacity": 0, "dim": dim}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f: meta = json.load(f)
+            if meta.get("dim") != dim: raise ValueError(f"Vector index at {path} has dim {meta.get('dim')}, expected {dim}")
+        self.n_rows, self.n_docs, self.capacity = meta["rows"], meta["docs"], meta["capacity"]
+        self.df = np.fromfile(os.path.join(path, "df.f64")) if os.path.exists(os.path.join(path, "df.f64")) else np.zeros(dim)
+        self._open(max(self.capacity, 1024))
+        self._norms = None
+
+    def _open(self, capacity):
+        """(Re)maps the data files at the given row capacity, growing them on disk if needed."""
+        for name, dtype, width in (("vectors.f32", np.float32, self.dim), ("chunk_ids.i64", np.int64, 1)):
+            file_path = os.path.join(self.path, name)
+            needed = capacity * width * np.dtype(dtype).itemsize
+            with open(file_path, "ab") as f:
+                if f.tell() < needed: f.truncate(needed)
+        self.vectors = np.memmap(os.path.join(self.path, "vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.chunk_ids = np.memmap(os.path.join(self.path, "chunk_ids.i64"), dtype=np.int64, mode="r+", shape=(capacity,))
+        if capacity > self.capacity:
+            self.chunk_ids[self.capacity:] = -1
+            self.capacity = capacity
+
+    def _flush(self):
+        self.vectors.flush(); self.chunk_ids.flush()
+        self.df.tofile(os.path.join(self.path, "df.f64"))
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"rows": self.n_rows, "docs": self.n_docs, "capacity": self.capacity, "dim": self.dim}, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def indexed_ids(self):
+        with self.lock:
+            ids = np.asarray(self.chunk_ids[:self.n_rows])
+            return set(ids[ids >= 0].tolist())
+
+    def add(self, chunk_ids, texts):
+        if not chunk_ids: return
+        new_vectors = embed(texts, self.dim)
+        with self.lock:
+            if self.n_rows + len(chunk_ids) > self.capacity:
+                self._open(max(self.capacity * 2, self.n_rows + len(chunk_ids)))
+            end = self.n_rows + len(chunk_ids)
+            self.vectors[self.n_rows:end] = new_vectors
+            self.chunk_ids[self.n_rows:end] = chunk_ids
+            self.df += (new_vectors > 0).sum(axis=0)
+            self.n_rows, self.n_docs = end, self.n_docs + len(chunk_ids)
+            self._norms = None
+            self._flush()
+
+    def remove(self, chunk_ids):
+        if not chunk_ids: return
+        with self.lock:
+            rows = np.nonzero(np.isin(self.chunk_ids[:self.n_rows], list(chunk_ids)))[0]
+            if not len(rows): return
+            self.df -= (self.vectors[rows] > 0).sum(axis=0)
+            self.vectors[rows] = 0.0
+            self.chunk_ids[rows] = -1
+            self.n_docs -= len(rows)
+            self._norms = None
+            self._flush()
+
+    def search(self, query, k=10):
+        """Cosine top-k over the TF-IDF-weighted vectors. Returns [(chunk_id, score)], best first."""
+        q = embed([query], self.dim)[0]
+        with self.lock:
+            if not self.n_rows or not q.any(): return []
+            idf = (np.log((1.0 + self.n_docs) / (1.0 + self.df)) + 1.0).astype(np.float32)
+            weights = idf * idf
+            matrix = self.vectors[:self.n_rows]
+            if self._norms is None:
+                # Row norms under the current IDF; recomputed lazily after each add/remove, in blocks to bound memory
+                self._norms = np.concatenate([np.sqrt((block * block) @ weights) for block in np.array_split(matrix, max(1, self.n_rows // 4096))])
+            q_norm = float(np.sqrt((q * q) @ weights))
+            scores = (matrix @ (q * weights)) / (self._norms * q_norm + 1e-9)
+            ids = np.asarray(self.chunk_ids[:self.n_rows])
+            scores[ids < 0] = -1.0
+            k = min(k, self.n_rows)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+@st.cache_resource
+def get_vector_index():
+    return VectorIndex()
+
+def semantic_search(conn, query, k=10, source=None):
+    """Vector counterpart of vault_engine.search: synonym-aware top-k passages, same result shape."""
+    hits = get_vector_index().search(query, k=k * 4 if source else k)
+    if not hits: return []
+    scores = dict(hits)
+    placeholders = ",".join("?" * len(scores))
+    rows = conn.execute(f"SELECT id, source, doc_id, filename, chunk FROM kb_chunks WHERE id IN ({placeholders})", list(scores)).fetchall()
+    results = [{"source": r[1], "doc_id": r[2], "filename": r[3], "chunk": r[4], "score": scores[r[0]]} for r in rows if source is None or r[1] == source]
+    return sorted(results, key=lambda r: -r['score'])[:k]